@@ -11,9 +11,12 @@ import logging
 def setup_streamlit_environment():
     """Configurer l'environnement pour éviter les conflits"""
     
+    from src import _torch_setup
+    
     # Désactiver les warnings PyTorch problématiques
     os.environ["TOKENIZERS_PARALLELISM"] = "false"
-    os.environ["OMP_NUM_THREADS"] = "1"
+    # Processus unique : threads natifs = cœurs physiques / NPROC_PER_NODE
+    _torch_setup.apply_thread_env()
     
     # Configuration logging pour réduire le bruit
     logging.getLogger("transformers").setLevel(logging.ERROR)
@@ -22,8 +25,8 @@ def setup_streamlit_environment():
     # Import conditionnel de PyTorch pour éviter les conflits
     try:
         import torch
-        # Forcer PyTorch en mode CPU et single-thread
-        torch.set_num_threads(1)
+        # Forcer PyTorch en mode CPU, threads alignés sur OpenMP
+        _torch_setup.once()
         if hasattr(torch, '_C') and hasattr(torch._C, '_disable_torch_function_mode'):
             torch._C._disable_torch_function_mode()
     except ImportError:
@@ -37,16 +40,16 @@ def setup_streamlit_environment():
 import os
 import sys
 
+from src import _torch_setup
+
 # Configuration précoce pour éviter les conflits
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
-os.environ["OMP_NUM_THREADS"] = "1"
+_torch_setup.apply_thread_env()
 
 # Import conditionnel et sécurisé de PyTorch
 def safe_torch_import():
     try:
-        import torch
-        torch.set_num_threads(1)
-        return True
+        return _torch_setup.once()
     except Exception:
         return False
 
@@ -98,7 +101,7 @@ except ImportError:
 try:
     # Configuration PyTorch avant import
     import torch
-    torch.set_num_threads(1)
+    _torch_setup.once()
     
     from transformers import pipeline
     import transformers
@@ -128,10 +131,13 @@ except ImportError:
 
 import re
 import os
+import sys
 import tempfile
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator
 from dataclasses import dataclass, asdict
 
 # Imports pour le traitement de documents
@@ -147,6 +153,40 @@ except ImportError:
 AI_SUPPORT = False
 SPACY_SUPPORT = False
 
+# Scan dans les workers : module léger, importable sans Streamlit ni torch
+from src import scan_worker
+
+@dataclass
+class SimpleEntity:
+    """Entité regex compacte : ni ``__dict__`` ni champs redondants.
+    
+    L'identifiant est l'index dans la liste, la confiance vaut toujours 1.0
+    pour les regex et la valeur se relit dans le texte source.
+    """
+    # Déclarés à la main : ``dataclass(slots=True)`` exige Python 3.10
+    __slots__ = ("type", "start", "end", "replacement")
+    
+    type: str
+    start: int
+    end: int
+    replacement: str
+    
+    def value(self, text: str) -> str:
+        """Valeur détectée, relue dans ``text``"""
+        return text[self.start:self.end].strip()
+    
+    def to_dict(self, text: str, index: int) -> Dict[str, Any]:
+        """Dictionnaire historique de ``detect_entities`` (id, valeur, confiance)"""
+        return {
+            "id": f"entity_{index}",
+            "type": self.type,
+            "value": self.value(text),
+            "start": self.start,
+            "end": self.end,
+            "confidence": 1.0,
+            "replacement": self.replacement,
+        }
+
 class SimpleAnonymizer:
     """Version simplifiée sans IA pour éviter les conflits Streamlit/PyTorch"""
     
@@ -154,75 +194,186 @@ class SimpleAnonymizer:
         from .config import ENTITY_PATTERNS, DEFAULT_REPLACEMENTS
         self.patterns = ENTITY_PATTERNS
         self.replacements = DEFAULT_REPLACEMENTS
+        # Un scan indépendant par type, dans l'ordre de ``ENTITY_PATTERNS`` :
+        # une alternance unique consommerait le texte de la première branche
+        # trouvée et masquerait une correspondance plus longue d'un autre type
+        # (SIRET/SIREN, téléphone, IBAN...), alors que la résolution des
+        # chevauchements retient la plus longue. Drapeaux en ligne : syntaxe
+        # commune à ``re`` et ``re2``.
+        self._pattern_sources = tuple(
+            (sys.intern(t), "(?im)" + pattern) for t, pattern in self.patterns.items()
+        )
+        self._compiled = tuple(
+            (t, scan_worker.compile_pattern(source)) for t, source in self._pattern_sources
+        )
+        self._replacement_by_type = {
+            t: self.replacements.get(t, f"[{t}]") for t in self.patterns
+        }
+        self._scan = self._build_scanner()
+    
+    def _build_scanner(self):
+        """Spécialiser la boucle de scan pour le jeu de patterns courant.
+        
+        Les méthodes ``finditer`` et les remplacements sont résolus une fois
+        dans un tuple ; tout est lié en variables locales.
+        """
+        table = tuple(
+            (compiled.finditer, entity_type, self._replacement_by_type[entity_type])
+            for entity_type, compiled in self._compiled
+        )
+        entity_cls = SimpleEntity
+        
+        def scan(text: str, offset: int, out: List["SimpleEntity"]) -> None:
+            append = out.append
+            for finditer, entity_type, replacement in table:
+                for match in finditer(text):
+                    start, end = match.span()
+                    append(entity_cls(entity_type, offset + start, offset + end, replacement))
+        
+        return scan
     
     def detect_entities(self, text: str) -> List[Dict]:
-        """Détection avec regex uniquement"""
-        entities = []
-        entity_id = 0
+        """Détection avec regex uniquement (résultat trié par début croissant).
+        
+        Conserve l'interface d'origine : une liste de dictionnaires. Les
+        traitements volumineux peuvent utiliser ``detect_entity_records``.
+        """
+        return [
+            entity.to_dict(text, index)
+            for index, entity in enumerate(self.detect_entity_records(text))
+        ]
+    
+    def detect_entity_records(self, text: str) -> List["SimpleEntity"]:
+        """Détection renvoyant des ``SimpleEntity`` compactes, triées par début"""
+        entities = list(self.detect_entities_iter([(0, text)]))
+        return self._remove_overlapping_entities(entities)
+    
+    def detect_entities_iter(self, chunks: Iterable[Tuple[int, str]]) -> Iterator["SimpleEntity"]:
+        """Détection sur un flux de morceaux ``(offset, texte)``.
+        
+        Les positions produites sont exprimées dans le document complet :
+        un producteur (ex. itération page par page de pdfplumber) peut
+        alimenter la détection sans matérialiser tout le texte. Les
+        chevauchements ne sont pas résolus ici.
+        """
+        scan = self._scan
+        
+        for offset, chunk in chunks:
+            found: List[SimpleEntity] = []
+            scan(chunk, offset, found)
+            yield from found
+    
+    def detect_entities_parallel(
+        self,
+        chunks: Iterable[Tuple[int, str]],
+        max_workers: Optional[int] = None,
+        start_method: Optional[str] = None,
+    ) -> List["SimpleEntity"]:
+        """Détection répartie sur plusieurs processus (un morceau par tâche).
+        
+        Le GIL empêche ``re`` de profiter des threads : chaque page est
+        scannée dans un processus distinct puis les résultats sont fusionnés
+        et les chevauchements résolus comme dans ``detect_entity_records``.
+        
+        Les workers démarrent par ``forkserver`` (``spawn`` hors POSIX) :
+        l'appelant peut déjà faire tourner des threads (Streamlit, pools
+        intra-op de torch) et un ``fork`` dans cet état risque un
+        interblocage. Ils n'importent que ``src.scan_worker``, pas ce
+        script. ``start_method="fork"`` n'est sûr que depuis un appelant
+        mono-thread.
+        """
+        chunks = list(chunks)
+        if len(chunks) < 2:
+            return self._remove_overlapping_entities(list(self.detect_entities_iter(chunks)))
         
-        for entity_type, pattern in self.patterns.items():
-            compiled_pattern = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
-            for match in compiled_pattern.finditer(text):
-                entity = {
-                    "id": f"entity_{entity_id}",
-                    "type": entity_type,
-                    "value": match.group().strip(),
-                    "start": match.start(),
-                    "end": match.end(),
-                    "confidence": 1.0,
-                    "replacement": self.replacements.get(entity_type, f"[{entity_type}]")
-                }
-                entities.append(entity)
-                entity_id += 1
+        if max_workers is None:
+            # Même règle que les pools natifs : cœurs physiques / processus par nœud
+            max_workers = _torch_setup.compute_num_threads()
+        
+        if start_method is None:
+            available = multiprocessing.get_all_start_methods()
+            start_method = "forkserver" if "forkserver" in available else "spawn"
+        context = multiprocessing.get_context(start_method)
+        if start_method == "forkserver":
+            # Le serveur précharge le module de scan plutôt que ``__main__``
+            context.set_forkserver_preload(["src.scan_worker"])
+        with ProcessPoolExecutor(
+            max_workers=min(max_workers, len(chunks)),
+            mp_context=context,
+            initializer=scan_worker.init_worker,
+            initargs=(self._pattern_sources,),
+        ) as executor:
+            offsets, texts = zip(*chunks)
+            results = executor.map(scan_worker.scan_chunk, offsets, texts)
+            
+            entities = []
+            replacement_by_type = self._replacement_by_type
+            for matches in results:
+                for entity_type, start, end in matches:
+                    entity_type = sys.intern(entity_type)
+                    entities.append(
+                        SimpleEntity(entity_type, start, end, replacement_by_type[entity_type])
+                    )
         
         return self._remove_overlapping_entities(entities)
     
-    def _remove_overlapping_entities(self, entities: List[Dict]) -> List[Dict]:
+    def _remove_overlapping_entities(self, entities: List["SimpleEntity"]) -> List["SimpleEntity"]:
         """Éliminer les chevauchements"""
         if not entities:
             return entities
         
-        sorted_entities = sorted(entities, key=lambda x: x["start"])
+        sorted_entities = sorted(entities, key=lambda x: x.start)
         filtered_entities = []
         
+        # Les entités retenues sont triées et disjointes : seule la dernière
+        # peut chevaucher l'entité courante (balayage linéaire)
         for entity in sorted_entities:
-            overlaps = False
-            for accepted_entity in filtered_entities:
-                if (entity["start"] < accepted_entity["end"] and 
-                    entity["end"] > accepted_entity["start"]):
-                    entity_length = entity["end"] - entity["start"]
-                    accepted_length = accepted_entity["end"] - accepted_entity["start"]
-                    
-                    if entity_length > accepted_length:
-                        filtered_entities.remove(accepted_entity)
-                        filtered_entities.append(entity)
-                    overlaps = True
-                    break
-            
-            if not overlaps:
+            if filtered_entities and entity.start < filtered_entities[-1].end:
+                last = filtered_entities[-1]
+                if entity.end - entity.start > last.end - last.start:
+                    filtered_entities[-1] = entity
+            else:
                 filtered_entities.append(entity)
         
         return filtered_entities
     
-    def anonymize_text(self, text: str, entities: List[Dict]) -> str:
-        """Anonymiser le texte"""
-        sorted_entities = sorted(entities, key=lambda x: x["start"], reverse=True)
+    def anonymize_text(self, text: str, entities: List[Any]) -> str:
+        """Anonymiser le texte.
         
-        anonymized_text = text
-        for entity in sorted_entities:
-            replacement = entity.get("replacement", f"[{entity['type']}]")
-            anonymized_text = (
-                anonymized_text[:entity["start"]] + 
-                replacement + 
-                anonymized_text[entity["end"]:]
-            )
+        ``entities`` contient les dictionnaires de ``detect_entities`` ou des
+        ``SimpleEntity`` et doit être trié par position de début croissante,
+        ce que garantissent les méthodes de détection.
+        """
+        spans = [
+            (e["start"], e["end"], e.get("replacement", f"[{e['type']}]")) if isinstance(e, dict)
+            else (e.start, e.end, e.replacement)
+            for e in entities
+        ]
+        if __debug__:
+            assert all(
+                spans[i][0] <= spans[i + 1][0]
+                for i in range(len(spans) - 1)
+            ), "entities doit être trié par position de début"
+        
+        # Assemblage en une passe : une seule copie du texte au final
+        parts = []
+        cursor = 0
+        for start, end, replacement in spans:
+            if start < cursor:
+                # Entité chevauchant un remplacement déjà émis
+                continue
+            parts.append(text[cursor:start])
+            parts.append(replacement)
+            cursor = end
+        parts.append(text[cursor:])
         
-        return anonymized_text
+        return "".join(parts)
 
 # 5. Script de diagnostic: check_environment.py
 
 import sys
 import importlib
+import importlib.util
 
 def check_dependencies():
     """Vérifier les dépendances et diagnostiquer les problèmes"""
@@ -242,23 +393,22 @@ def check_dependencies():
     issues = []
     
     for dep, description in dependencies.items():
+        module_name = "docx" if dep == "python-docx" else dep.replace("-", "_")
         try:
-            if dep == "python-docx":
-                importlib.import_module("docx")
-            else:
-                importlib.import_module(dep.replace("-", "_"))
-            
-            available[dep] = True
-            print(f"✅ {dep}: {description}")
-            
-        except ImportError:
-            available[dep] = False
-            print(f"❌ {dep}: {description} - NON INSTALLÉ")
-            issues.append(dep)
-        except Exception as e:
+            # find_spec localise le module sans exécuter son code (torch: ~secondes)
+            spec = importlib.util.find_spec(module_name)
+        except (ImportError, ValueError) as e:
             available[dep] = False
             print(f"⚠️ {dep}: {description} - ERREUR: {e}")
             issues.append(dep)
+            continue
+        
+        available[dep] = spec is not None
+        if available[dep]:
+            print(f"✅ {dep}: {description}")
+        else:
+            print(f"❌ {dep}: {description} - NON INSTALLÉ")
+            issues.append(dep)
     
     print(f"\n=== RÉSUMÉ ===")
     print(f"Python version: {sys.version}")
@@ -266,8 +416,9 @@ def check_dependencies():
     
     if available.get("torch") and available.get("transformers"):
         try:
-            import torch
-            torch.set_num_threads(1)
+            from src import _torch_setup
+            if not _torch_setup.once():
+                raise ImportError("torch introuvable à l'import")
             print("✅ Configuration PyTorch: OK")
         except Exception as e:
             print(f"⚠️ Configuration PyTorch: {e}")
@@ -3,51 +3,59 @@
 Correction rapide des erreurs de syntaxe dans anonymizer.py
 """
 
+import ast
+import mmap
+import re
+import shutil
+
+# Expressions régulières tronquées (ancre ``$`` perdue) -> version corrigée.
+# Les variantes plus longues (``re.sub(...``, ``cleaned = ...``) contiennent
+# ces motifs et sont donc couvertes par la même substitution.
+# Motifs en ASCII pur : le fichier est traité en octets, sans décodage UTF-8.
+BROKEN_PATTERNS = {
+    b"r'[.,;:!?]+, ''": b"r'[.,;:!?]+$', ''",
+    b'r"[.,;:!?]+, ""': b'r"[.,;:!?]+$", ""',
+}
+_BROKEN_RE = re.compile(b"|".join(re.escape(old) for old in BROKEN_PATTERNS))
+
+
 def fix_anonymizer():
     """Corriger rapidement les erreurs"""
     
     print("🔧 Correction des erreurs de syntaxe...")
     
-    # Lire le fichier
-    with open("src/anonymizer.py", "r", encoding="utf-8") as f:
-        content = f.read()
-    
-    # Sauvegarder l'original
-    with open("src/anonymizer.py.backup", "w", encoding="utf-8") as f:
-        f.write(content)
+    # Sauvegarder l'original (copie binaire, sans décodage)
+    shutil.copyfile("src/anonymizer.py", "src/anonymizer.py.backup")
     print("📋 Sauvegarde créée: src/anonymizer.py.backup")
     
-    # Corrections
-    fixes = 0
-    
-    # Correction principale
-    if "re.sub(r'[.,;:!?]+, ''" in content:
-        content = content.replace("re.sub(r'[.,;:!?]+, ''", "re.sub(r'[.,;:!?]+$', ''")
-        fixes += 1
-        print("✅ Correction 1: Expression régulière corrigée")
-    
-    # Autres corrections possibles
-    replacements = [
-        ("r'[.,;:!?]+, ''", "r'[.,;:!?]+$', ''"),
-        ('r"[.,;:!?]+, ""', 'r"[.,;:!?]+$", ""'),
-        ("cleaned = re.sub(r'[.,;:!?]+, '', cleaned)", "cleaned = re.sub(r'[.,;:!?]+$', '', cleaned)"),
-    ]
-    
-    for old, new in replacements:
-        if old in content:
-            content = content.replace(old, new)
-            fixes += 1
-            print(f"✅ Correction: {old} → {new}")
+    # Projection mémoire : recherche en octets sans copie ni décodage
+    with open("src/anonymizer.py", "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # fichier vide : rien à projeter
+            mm = None
+        if mm is None:
+            content, fixes = b"", 0
+        else:
+            with mm:
+                if _BROKEN_RE.search(mm):
+                    # Corrections en une seule passe
+                    content, fixes = _BROKEN_RE.subn(
+                        lambda m: BROKEN_PATTERNS[m.group(0)], mm
+                    )
+                else:
+                    content, fixes = mm[:], 0
     
-    # Écrire le fichier corrigé
-    with open("src/anonymizer.py", "w", encoding="utf-8") as f:
-        f.write(content)
+    # Écrire le fichier corrigé (uniquement s'il a changé)
+    if fixes:
+        with open("src/anonymizer.py", "wb") as f:
+            f.write(content)
+        print("✅ Expression(s) régulière(s) corrigée(s)")
     
     print(f"🎉 {fixes} correction(s) appliquée(s)")
     
     # Tester la syntaxe
     try:
-        import ast
         ast.parse(content)
         print("✅ Syntaxe vérifiée - Fichier correct!")
         return True
@@ -60,4 +68,4 @@ if __name__ == "__main__":
         print("\n🚀 SUCCÈS! Vous pouvez maintenant lancer:")
         print("   streamlit run main.py")
     else:
-        print("\n⚠️ Correction manuelle nécessaire")
\ No newline at end of file
+        print("\n⚠️ Correction manuelle nécessaire")
@@ -19,16 +19,15 @@ logging.getLogger("tensorflow").setLevel(logging.ERROR)
 # Variables d'environnement critiques AVANT tous les imports
 os.environ.update({
     "TOKENIZERS_PARALLELISM": "false",
-    "OMP_NUM_THREADS": "1",
-    "MKL_NUM_THREADS": "1", 
-    "OPENBLAS_NUM_THREADS": "1",
-    "VECLIB_MAXIMUM_THREADS": "1",
-    "NUMEXPR_NUM_THREADS": "1",
     "KMP_DUPLICATE_LIB_OK": "TRUE",
     "PYTORCH_JIT": "0",
     "PYTORCH_JIT_USE_NNC": "0"
 })
 
+# Threads natifs : un processus unique, donc autant que de cœurs physiques
+from src import _torch_setup
+_torch_setup.apply_thread_env()
+
 # Suppression des warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 warnings.filterwarnings("ignore", category=FutureWarning)
@@ -42,9 +41,9 @@ def configure_pytorch_safe():
     try:
         import torch
         
-        # Configuration threads
+        # Configuration threads (une seule fois par processus)
         try:
-            torch.set_num_threads(1)
+            _torch_setup.once()
         except (RuntimeError, ValueError) as thread_error:
             # Some environments do not support modifying thread settings
             logging.warning(f"PyTorch thread configuration warning: {thread_error}")
@@ -69,17 +68,53 @@ PYTORCH_AVAILABLE = configure_pytorch_safe()
 
 # === IMPORTS STREAMLIT ET MODULES ===
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+import shutil
 import tempfile
 import zipfile
 from pathlib import Path
+import bisect
+import html
 import json
+from collections import Counter
+from functools import wraps
+from itertools import islice
+import re
 from datetime import datetime
-import time
 import asyncio
 import threading
 from concurrent.futures import ThreadPoolExecutor
 import queue
 
+# Dépendances optionnelles de visualisation et de supervision
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
+
+try:
+    import plotly.express as px
+    import plotly.graph_objects as go
+    PLOTLY_SUPPORT = True
+except ImportError:
+    px = go = None
+    PLOTLY_SUPPORT = False
+
+try:
+    import psutil
+    PSUTIL_SUPPORT = True
+except ImportError:
+    psutil = None
+    PSUTIL_SUPPORT = False
+
+# Fragments (Streamlit >= 1.33) : une interaction avec un widget d'un onglet
+# ne réexécute que cet onglet. Sur les versions plus anciennes, rendu complet.
+st_fragment = (
+    getattr(st, "fragment", None)
+    or getattr(st, "experimental_fragment", None)
+    or (lambda func: func)
+)
+
 # Configuration Streamlit optimisée
 st.set_page_config(
     page_title="Anonymiseur de Documents Juridiques",
@@ -100,9 +135,9 @@ try:
     from src.utils import (
         format_file_size,
         save_upload_file,
+        hash_upload_content,
         cleanup_temp_files,
         generate_anonymization_stats,
-        calculate_text_coverage,
     )
     from src.config import ENTITY_COLORS, SUPPORTED_FORMATS, MAX_FILE_SIZE, ANONYMIZATION_PRESETS
     from src.streamlit_legal_ui import display_legal_entity_manager
@@ -113,156 +148,24 @@ except ImportError as e:
     st.stop()
 
 # === CSS PERSONNALISÉ AMÉLIORÉ ===
-st.markdown("""
-<style>
-    .main-header {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        padding: 2rem;
-        border-radius: 15px;
-        color: white;
-        text-align: center;
-        margin-bottom: 2rem;
-        box-shadow: 0 10px 30px rgba(102, 126, 234, 0.3);
-    }
-    
-    .main-header h1 {
-        margin: 0;
-        font-size: 2.5rem;
-        font-weight: 700;
-    }
-    
-    .main-header p {
-        margin: 0.5rem 0;
-        opacity: 0.9;
-    }
-    
-    .entity-badge {
-        display: inline-block;
-        padding: 0.4rem 0.8rem;
-        margin: 0.2rem;
-        border-radius: 20px;
-        font-size: 0.85rem;
-        font-weight: 600;
-        color: white;
-        box-shadow: 0 2px 8px rgba(0,0,0,0.2);
-        transition: transform 0.2s ease;
-    }
-    
-    .entity-badge:hover {
-        transform: translateY(-2px);
-    }
-    
-    .stats-card {
-        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-        padding: 1.5rem;
-        border-radius: 15px;
-        border-left: 5px solid #667eea;
-        margin: 1rem 0;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-    }
-    
-    .success-animation {
-        background: linear-gradient(135deg, #d4edda 0%, #c3e6cb 100%);
-        border: 2px solid #28a745;
-        color: #155724;
-        padding: 1.5rem;
-        border-radius: 15px;
-        margin: 1rem 0;
-        animation: pulse 2s infinite;
-    }
-    
-    @keyframes pulse {
-        0% { box-shadow: 0 0 0 0 rgba(40, 167, 69, 0.4); }
-        70% { box-shadow: 0 0 0 10px rgba(40, 167, 69, 0); }
-        100% { box-shadow: 0 0 0 0 rgba(40, 167, 69, 0); }
-    }
-    
-    .error-message {
-        background: linear-gradient(135deg, #f8d7da 0%, #f5c6cb 100%);
-        border: 2px solid #dc3545;
-        color: #721c24;
-        padding: 1.5rem;
-        border-radius: 15px;
-        margin: 1rem 0;
-    }
-    
-    .processing-container {
-        text-align: center;
-        padding: 3rem;
-        background: linear-gradient(135deg, #e3f2fd 0%, #bbdefb 100%);
-        border-radius: 20px;
-        margin: 2rem 0;
-    }
-    
-    .processing-spinner {
-        width: 60px;
-        height: 60px;
-        border: 6px solid #e3f2fd;
-        border-top: 6px solid #2196f3;
-        border-radius: 50%;
-        animation: spin 1s linear infinite;
-        margin: 0 auto 1rem;
-    }
-    
-    @keyframes spin {
-        0% { transform: rotate(0deg); }
-        100% { transform: rotate(360deg); }
-    }
-    
-    .highlight-text {
-        background: linear-gradient(135deg, #fff3cd 0%, #ffeaa7 100%);
-        padding: 4px 8px;
-        border-radius: 8px;
-        font-weight: 600;
-        box-shadow: 0 2px 4px rgba(0,0,0,0.1);
-    }
-    
-    .metric-card {
-        background: white;
-        padding: 1.5rem;
-        border-radius: 15px;
-        text-align: center;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        border-top: 4px solid #667eea;
-    }
-    
-    .confidence-bar {
-        background: linear-gradient(90deg, #dc3545 0%, #ffc107 50%, #28a745 100%);
-        height: 8px;
-        border-radius: 4px;
-        margin: 0.5rem 0;
-    }
-    
-    .sidebar-info {
-        background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-        color: white;
-        padding: 1rem;
-        border-radius: 10px;
-        margin: 1rem 0;
-    }
-    
-    .entity-item {
-        background: white;
-        border: 1px solid #e9ecef;
-        border-radius: 10px;
-        padding: 1rem;
-        margin: 0.5rem 0;
-        transition: all 0.3s ease;
-    }
-    
-    .entity-item:hover {
-        box-shadow: 0 5px 15px rgba(0,0,0,0.1);
-        transform: translateY(-2px);
-    }
-    
-    .tab-container {
-        background: white;
-        border-radius: 15px;
-        padding: 1rem;
-        box-shadow: 0 5px 15px rgba(0,0,0,0.05);
-    }
-</style>
-""", unsafe_allow_html=True)
+CSS_PATH = Path(__file__).parent / "src" / "resources" / "style.css"
+
+
+@st.cache_resource(show_spinner=False)
+def load_custom_css():
+    """Lire la feuille de style une seule fois par processus.
+
+    Le bloc ``<style>`` doit être réémis à chaque rerun (Streamlit retire les
+    éléments non redessinés) : seule la lecture du fichier est mise en cache.
+    """
+    try:
+        return f"<style>\n{CSS_PATH.read_text(encoding='utf-8')}</style>"
+    except OSError as e:
+        logging.warning(f"Feuille de style introuvable: {e}")
+        return ""
+
+
+st.markdown(load_custom_css(), unsafe_allow_html=True)
 
 # === GESTION D'ÉTAT AMÉLIORÉE ===
 def init_session_state():
@@ -278,8 +181,8 @@ def init_session_state():
         "current_preset": "standard",
         "entity_manager": EntityManager(),
         "processing_stats": {},
-        "anonymizer": None,
         "last_file_hash": None,
+        "last_processing_mode": None,
         "export_options": {
             "add_watermark": False,
             "watermark_text": "DOCUMENT ANONYMISÉ - CONFORME RGPD",
@@ -292,16 +195,41 @@ def init_session_state():
         if key not in st.session_state:
             st.session_state[key] = value
 
+@st.cache_resource(show_spinner=False)
+def _get_anonymizer_global():
+    """Anonymiseur unique du processus : les modèles NER sont chargés une
+    seule fois et partagés par toutes les sessions."""
+    return DocumentAnonymizer(
+        prefer_french=True,
+        use_spacy=True
+    )
+
+@st.cache_resource(show_spinner=False)
+def get_anonymizer_lock():
+    """Verrou des opérations qui modifient l'état de l'anonymiseur partagé
+    (mapping, compteurs, configuration des filtres)."""
+    return threading.Lock()
+
 def get_anonymizer():
-    """Obtenir ou créer l'anonymizer avec cache"""
-    if st.session_state.anonymizer is None:
-        st.session_state.anonymizer = DocumentAnonymizer(
-            prefer_french=True,
-            use_spacy=True
-        )
-    return st.session_state.anonymizer
+    """Obtenir l'anonymizer partagé (créé au premier appel)"""
+    return _get_anonymizer_global()
 
 # === INTERFACE UTILISATEUR AMÉLIORÉE ===
+# Libellés des types d'entités affichés dans les capacités de détection
+ENTITY_TYPE_DESCRIPTIONS = {
+    'EMAIL': '📧 Adresses email',
+    'PHONE': '📞 Numéros de téléphone',
+    'DATE': '📅 Dates',
+    'ADDRESS': '🏠 Adresses postales',
+    'IBAN': '💳 Comptes bancaires',
+    'SIREN': '🏢 SIREN entreprises',
+    'SIRET': '🏢 SIRET établissements',
+    'PERSON': '👤 Noms de personnes',
+    'ORG': '🏛️ Organisations',
+    'SSN': '🆔 Numéros de sécurité sociale',
+    'CREDIT_CARD': '💳 Cartes bancaires',
+}
+
 def display_header():
     """En-tête amélioré avec informations système"""
     st.markdown("""
@@ -325,22 +253,22 @@ def display_system_status():
                 st.warning("⚠️ PyTorch: Non disponible")
         
         with col2:
-            # Statut NER
-            try:
-                anonymizer = get_anonymizer()
-                if anonymizer.ai_anonymizer and anonymizer.ai_anonymizer.spacy_nlp:
-                    st.success("✅ NER (SpaCy): Actif")
-                elif anonymizer.ai_anonymizer and anonymizer.ai_anonymizer.nlp_pipeline:
-                    st.success("✅ NER (Transformers): Actif") 
-                else:
-                    st.info("ℹ️ NER: Mode Regex uniquement")
-            except:
-                st.warning("⚠️ NER: Erreur de chargement")
+            # Statut NER (sondage des paquets, sans instancier l'anonymiseur)
+            backend, available = DocumentAnonymizer.probe_ner_status()
+            if backend == "spacy" and available:
+                st.success("✅ NER (SpaCy): Disponible")
+            elif backend == "transformers":
+                st.success("✅ NER (Transformers): Disponible")
+            elif backend == "spacy":
+                st.warning("⚠️ NER: Modèle SpaCy français non installé")
+            else:
+                st.info("ℹ️ NER: Mode Regex uniquement")
         
         with col3:
             # Mémoire système
             try:
-                import psutil
+                if not PSUTIL_SUPPORT:
+                    raise ImportError("psutil")
                 memory = psutil.virtual_memory()
                 memory_percent = memory.percent
                 if memory_percent < 70:
@@ -349,9 +277,36 @@ def display_system_status():
                     st.warning(f"⚠️ Mémoire: {memory_percent:.1f}%")
                 else:
                     st.error(f"❌ Mémoire: {memory_percent:.1f}%")
-            except:
+            except (ImportError, OSError, RuntimeError):
                 st.info("ℹ️ Mémoire: Non disponible")
 
+def _cached_upload_hash(uploaded_file):
+    """Hash du fichier uploadé, mémorisé dans la session entre deux reruns.
+
+    Streamlit réexécute le script à chaque interaction : sans ce cache, tout
+    le contenu serait re-haché. La clé combine l'identifiant attribué par
+    Streamlit à l'upload (``id()`` à défaut) et la taille du fichier.
+    """
+    cache_key = (getattr(uploaded_file, "file_id", None) or id(uploaded_file), uploaded_file.size)
+    if st.session_state.get("_hash_cache_key") == cache_key:
+        return st.session_state["_hash_cache_value"]
+
+    file_hash = hash_upload_content(uploaded_file.getbuffer())
+    st.session_state["_hash_cache_key"] = cache_key
+    st.session_state["_hash_cache_value"] = file_hash
+    return file_hash
+
+@st.cache_data(show_spinner=False)
+def _render_preset_capabilities(preset_name):
+    """HTML des types détectés par un preset, construit une fois par preset"""
+    parts = []
+    for entity_type in ANONYMIZATION_PRESETS[preset_name]['entity_types']:
+        color = ENTITY_COLORS.get(entity_type, "#6c757d")
+        description = ENTITY_TYPE_DESCRIPTIONS.get(entity_type, f'📋 {entity_type}')
+        
+        parts.append(f'<div style="color: {color};">• {description}</div>')
+    return "".join(parts)
+
 def display_upload_section():
     """Section d'upload améliorée avec validation"""
     st.header("📁 Upload de Document")
@@ -406,9 +361,8 @@ def display_upload_section():
                 st.error(f"❌ Fichier trop volumineux ({format_file_size(uploaded_file.size)}). Maximum autorisé: {format_file_size(MAX_FILE_SIZE)}")
                 return None
             
-            # Calcul du hash pour détecter les changements
-            import hashlib
-            file_hash = hashlib.md5(uploaded_file.getvalue()).hexdigest()
+            # Calcul du hash pour détecter les changements (une fois par fichier)
+            file_hash = _cached_upload_hash(uploaded_file)
             
             # Affichage des informations
             st.success(f"✅ Fichier sélectionné: **{uploaded_file.name}**")
@@ -435,26 +389,11 @@ def display_upload_section():
         
         # Affichage des capacités selon le preset
         if st.session_state.current_preset in ANONYMIZATION_PRESETS:
-            preset = ANONYMIZATION_PRESETS[st.session_state.current_preset]
-            
             st.markdown("**🎯 Types détectés:**")
-            for entity_type in preset['entity_types']:
-                color = ENTITY_COLORS.get(entity_type, "#6c757d")
-                description = {
-                    'EMAIL': '📧 Adresses email',
-                    'PHONE': '📞 Numéros de téléphone',
-                    'DATE': '📅 Dates', 
-                    'ADDRESS': '🏠 Adresses postales',
-                    'IBAN': '💳 Comptes bancaires',
-                    'SIREN': '🏢 SIREN entreprises',
-                    'SIRET': '🏢 SIRET établissements',
-                    'PERSON': '👤 Noms de personnes',
-                    'ORG': '🏛️ Organisations',
-                    'SSN': '🆔 Numéros de sécurité sociale',
-                    'CREDIT_CARD': '💳 Cartes bancaires'
-                }.get(entity_type, f'📋 {entity_type}')
-                
-                st.markdown(f'<span style="color: {color};">• {description}</span>', unsafe_allow_html=True)
+            st.markdown(
+                _render_preset_capabilities(st.session_state.current_preset),
+                unsafe_allow_html=True,
+            )
         
         st.markdown("---")
         
@@ -486,9 +425,9 @@ def display_processing_options():
         st.session_state.processing_mode = mode
         
         if mode == "regex":
-            st.info("💡 Mode Regex: Détection basée sur des patterns prédéfinis. Rapide et fiable pour les données structurées.")
+            st.info("💡 Mode Regex: Détection basée sur des patterns prédéfinis. Rapide et fiable pour les données structurées. L'IA reste disponible ensuite via « Enrichir avec IA ».")
         else:
-            st.info("🧠 Mode IA: Combine NER (reconnaissance d'entités nommées) et patterns regex pour une détection maximale.")
+            st.info("🧠 Mode IA: Combine NER (reconnaissance d'entités nommées) et patterns regex pour une détection maximale. L'analyse initiale reste en regex ; la passe NER se lance depuis les résultats via « Enrichir avec IA ».")
     
     with col2:
         if mode == "ai":
@@ -520,10 +459,28 @@ def display_processing_options():
             st.checkbox("Mode debug", key="debug_mode", help="Affiche des informations de débogage")
             st.checkbox("Cache résultats", value=True, key="cache_results", help="Met en cache les résultats pour les gros documents")
 
-def _store_original_document(file_content, filename):
-    """Sauvegarder le document original pour l'export."""
-    import tempfile
+UPLOAD_COPY_BUFFER_SIZE = 1024 * 1024
 
+
+def _copy_upload_to_temp(source, filename):
+    """Recopier un fichier uploadé dans un fichier temporaire, par blocs.
+
+    ``source`` est un objet fichier (``UploadedFile``) : le contenu est
+    transféré par tranches de 1 Mio sans être matérialisé en mémoire.
+    """
+    source.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix) as tmp:
+        try:
+            shutil.copyfileobj(source, tmp, length=UPLOAD_COPY_BUFFER_SIZE)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+        return tmp.name
+
+
+def _store_original_document(source, filename):
+    """Sauvegarder le document original pour l'export."""
     temp_path = None
     try:
         # Supprimer l'ancien fichier original s'il existe
@@ -534,9 +491,7 @@ def _store_original_document(file_content, filename):
             except OSError:
                 pass
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix) as tmp:
-            tmp.write(file_content)
-            temp_path = tmp.name
+        temp_path = _copy_upload_to_temp(source, filename)
 
         st.session_state["original_file_path"] = temp_path
         return temp_path
@@ -551,20 +506,19 @@ def _store_original_document(file_content, filename):
         raise e
 
 
-def process_document_core(file_content, filename, mode, confidence, preset):
+def process_document_core(source, filename, mode, confidence, preset, progress_callback=None):
     """Logique de traitement core sans effets sur l'état de session."""
-    import tempfile
-
     temp_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(filename).suffix) as tmp:
-            tmp.write(file_content)
-            temp_path = tmp.name
+        temp_path = _copy_upload_to_temp(source, filename)
 
         anonymizer = get_anonymizer()
 
         # Traitement avec gestion d'erreurs robuste
-        result = anonymizer.process_document(temp_path, mode, confidence, audit=False)
+        with get_anonymizer_lock():
+            result = anonymizer.process_document(
+                temp_path, mode, confidence, audit=False, progress_callback=progress_callback
+            )
 
         return result
 
@@ -582,9 +536,103 @@ def process_document_core(file_content, filename, mode, confidence, preset):
 
 
 @st.cache_data(ttl=3600, show_spinner=False)
-def process_document_cached(file_content, filename, mode, confidence, preset):
-    """Traitement de document avec cache"""
-    return process_document_core(file_content, filename, mode, confidence, preset)
+def process_document_cached(_source, file_hash, filename, mode, confidence, preset, _progress_callback=None):
+    """Traitement de document avec cache.
+
+    Le fichier source (préfixé par ``_``) est exclu du calcul de la clé de
+    cache : Streamlit n'a ainsi pas à re-hacher plusieurs Mo à chaque appel,
+    le hash du fichier déjà calculé à l'upload servant de clé. Le callback de
+    progression n'est appelé qu'en l'absence de résultat en cache.
+    """
+    return process_document_core(
+        _source, filename, mode, confidence, preset, progress_callback=_progress_callback
+    )
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=32)
+def _cached_anonymization_stats(entities_key, text_length, _entities):
+    """Statistiques d'anonymisation mémorisées entre les reruns.
+
+    ``entities_key`` résume les seuls champs utilisés par les statistiques
+    (position, type, confiance) : la liste complète, préfixée par ``_``,
+    n'est pas hachée par Streamlit.
+    """
+    return generate_anonymization_stats(_entities, text_length)
+
+def _entities_stats_key(entities):
+    """Empreinte des champs lus par les statistiques (position, type, confiance)"""
+    return hash(tuple(
+        (e.get("start"), e.get("end"), e.get("type"), e.get("confidence"))
+        for e in entities
+    ))
+
+def _entities_content_key(entities):
+    """Empreinte du contenu des entités (identifiant, type, valeur, position,
+    confiance) pour les vues mises en cache dans la session.
+
+    Contrairement à ``id()`` de la liste, elle suit les modifications en
+    place et ne peut pas être confondue avec une liste libérée puis
+    remplacée par une autre de même taille.
+    """
+    return hash(tuple(
+        (e.get("id"), e.get("type"), e.get("value"), e.get("start"), e.get("end"), e.get("confidence"))
+        for e in entities
+    ))
+
+def get_anonymization_stats(entities, text_length):
+    """Statistiques des entités courantes, recalculées seulement si elles changent"""
+    return _cached_anonymization_stats(_entities_stats_key(entities), text_length, entities)
+
+@st.cache_data(ttl=3600, show_spinner=False, max_entries=32)
+def _cached_confidence_breakdown(entities_key, _entities):
+    """Confiances des entités et confiance moyenne par type.
+
+    Retourne ``(valeurs, moyennes)`` sous forme de tuples, directement
+    utilisables comme clés des figures mémoïsées.
+    """
+    confidence_sums = Counter()
+    confidence_counts = Counter()
+    values = []
+    for entity in _entities:
+        if 'confidence' in entity:
+            values.append(entity['confidence'])
+            confidence_sums[entity['type']] += entity['confidence']
+            confidence_counts[entity['type']] += 1
+    averages = tuple(
+        (entity_type, confidence_sums[entity_type] / count)
+        for entity_type, count in confidence_counts.items()
+    )
+    return tuple(values), averages
+
+PROGRESS_POLL_INTERVAL = 0.1
+
+
+@st.cache_resource(show_spinner=False)
+def _get_processing_executor():
+    """Thread de traitement partagé par le processus (un document à la fois)."""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="anonymizer")
+
+def _run_with_progress(task, on_progress):
+    """Exécuter ``task(callback)`` hors du thread du script.
+
+    Le script reste libre de rafraîchir l'interface : les messages de
+    progression émis par le thread de travail transitent par une file et
+    seul le thread du script appelle ``on_progress``. Le contexte Streamlit
+    est rattaché au thread de travail (session et caches).
+    """
+    updates = queue.Queue()
+    ctx = get_script_run_ctx()
+
+    def worker():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return task(lambda percent, message: updates.put((percent, message)))
+
+    future = _get_processing_executor().submit(worker)
+    while not (future.done() and updates.empty()):
+        try:
+            on_progress(*updates.get(timeout=PROGRESS_POLL_INTERVAL))
+        except queue.Empty:
+            pass
+    return future.result()
 
 def process_document_with_progress(uploaded_file):
     """Traiter le document avec barre de progression avancée"""
@@ -592,77 +640,67 @@ def process_document_with_progress(uploaded_file):
         # Configuration selon le preset
         preset = ANONYMIZATION_PRESETS.get(st.session_state.current_preset, ANONYMIZATION_PRESETS["standard"])
 
-        file_bytes = uploaded_file.getvalue()
+        file_hash = st.session_state.get("last_file_hash") or _cached_upload_hash(uploaded_file)
 
-        # Interface de progression
-        progress_container = st.empty()
-        progress_container.markdown("""
-        <div class="processing-container">
-            <div class="processing-spinner"></div>
-            <h3>🔄 Traitement en cours...</h3>
-            <p>Initialisation du système...</p>
-        </div>
-        """, unsafe_allow_html=True)
-        
         progress_bar = st.progress(0)
         status_text = st.empty()
         
-        # Étapes de traitement
-        steps = [
-            ("🔧 Initialisation", 10),
-            ("📖 Lecture du document", 25),
-            ("🧹 Préparation du texte", 35),
-            (f"🔍 Analyse {st.session_state.processing_mode.upper()}", 70),
-            ("⚡ Finalisation", 90),
-            ("✅ Terminé", 100)
-        ]
-        
-        for i, (step_name, progress) in enumerate(steps):
-            status_text.text(step_name)
-            progress_bar.progress(progress)
+        # Progression pilotée par les phases réelles du traitement
+        def report_progress(percent, message):
+            progress_bar.progress(percent)
+            status_text.text(message)
 
-            if i == 3:  # Étape d'analyse
-                # Traitement réel pendant cette étape
-                try:
-                    _store_original_document(file_bytes, uploaded_file.name)
-                except (OSError, ValueError) as e:
-                    progress_container.empty()
-                    progress_bar.empty()
-                    status_text.empty()
-                    st.error(f"❌ Erreur lors de l'enregistrement du document original: {str(e)}")
-                    return False
-
-                if st.session_state.get("cache_results", True):
-                    result = process_document_cached(
-                        file_bytes,
+        report_progress(10, "🔧 Initialisation")
+        with st.spinner("🔄 Traitement en cours..."):
+            try:
+                _store_original_document(uploaded_file, uploaded_file.name)
+            except (OSError, ValueError) as e:
+                progress_bar.empty()
+                status_text.empty()
+                st.error(f"❌ Erreur lors de l'enregistrement du document original: {str(e)}")
+                return False
+
+            # Ingestion toujours en regex (quelques secondes) : la passe NER,
+            # bien plus lente, n'est lancée qu'à la demande via « Enrichir
+            # avec IA » dans les résultats
+            mode = "regex"
+            confidence = st.session_state.confidence_threshold
+            preset_name = st.session_state.current_preset
+            if st.session_state.get("cache_results", True):
+                result = _run_with_progress(
+                    lambda callback: process_document_cached(
+                        uploaded_file,
+                        file_hash,
                         uploaded_file.name,
-                        st.session_state.processing_mode,
-                        st.session_state.confidence_threshold,
-                        st.session_state.current_preset
-                    )
-                else:
-                    result = process_document_core(
-                        file_bytes,
+                        mode,
+                        confidence,
+                        preset_name,
+                        _progress_callback=callback,
+                    ),
+                    report_progress,
+                )
+            else:
+                result = _run_with_progress(
+                    lambda callback: process_document_core(
+                        uploaded_file,
                         uploaded_file.name,
-                        st.session_state.processing_mode,
-                        st.session_state.confidence_threshold,
-                        st.session_state.current_preset
-                    )
-            
-            time.sleep(0.3)  # Animation fluide
+                        mode,
+                        confidence,
+                        preset_name,
+                        progress_callback=callback,
+                    ),
+                    report_progress,
+                )
         
         # Nettoyer l'interface de progression
-        progress_container.empty()
         progress_bar.empty()
         status_text.empty()
         
         # Traiter le résultat
         if result["status"] == "success":
             # Filtrer les entités selon le preset
-            filtered_entities = []
-            for entity in result["entities"]:
-                if entity["type"] in preset["entity_types"]:
-                    filtered_entities.append(entity)
+            allowed_types = frozenset(preset["entity_types"])
+            filtered_entities = [e for e in result["entities"] if e["type"] in allowed_types]
             
             # Mettre à jour l'état
             st.session_state.entities = filtered_entities
@@ -670,13 +708,12 @@ def process_document_with_progress(uploaded_file):
             st.session_state.processed_file_path = result.get("anonymized_path")
             st.session_state.processing_stats = result.get("metadata", {})
 
-            # Ajouter les entités au gestionnaire
-            st.session_state.entity_manager = EntityManager()
-            for entity in filtered_entities:
-                st.session_state.entity_manager.add_entity(entity)
+            # Charger les entités dans le gestionnaire en une passe
+            st.session_state.entity_manager = EntityManager.bulk_load(filtered_entities)
+            st.session_state.last_processing_mode = mode
 
             # Générer les métriques de performance
-            stats = generate_anonymization_stats(filtered_entities, len(result["text"]))
+            stats = get_anonymization_stats(filtered_entities, len(result["text"]))
             avg_conf = 0
             if stats.get("confidence_stats"):
                 avg_conf = stats["confidence_stats"].get("average", 0)
@@ -709,6 +746,136 @@ def process_document_with_progress(uploaded_file):
             st.exception(e)
         return False
 
+# === FIGURES PLOTLY MÉMOÏSÉES ===
+# Les figures sont partagées entre reruns (``cache_resource``) : ne pas les
+# modifier après coup. Les clés sont des tuples ``(type, valeur)`` dans
+# l'ordre d'affichage.
+FIGURE_CACHE_ENTRIES = 32
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def _build_type_bar_figure(type_items):
+    """Barres de répartition des entités par type"""
+    type_names = [entity_type for entity_type, _ in type_items]
+    df = pd.DataFrame({"Type": type_names, "Nombre": [count for _, count in type_items]})
+    fig = px.bar(
+        df, 
+        x="Type", 
+        y="Nombre",
+        color="Type",
+        color_discrete_map={t: ENTITY_COLORS.get(t, "#6c757d") for t in type_names},
+        title="Distribution des Entités Détectées"
+    )
+    fig.update_layout(showlegend=False, height=400)
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def _build_type_pie_figure(type_items):
+    """Camembert de répartition des entités par type"""
+    type_names = [entity_type for entity_type, _ in type_items]
+    fig = px.pie(
+        values=[count for _, count in type_items],
+        names=type_names,
+        color=type_names,
+        color_discrete_map={t: ENTITY_COLORS.get(t, "#6c757d") for t in type_names},
+        title="Répartition Proportionnelle"
+    )
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def _build_type_radar_figure(type_items):
+    """Radar des types d'entités"""
+    values = [count for _, count in type_items]
+    fig = go.Figure()
+    
+    fig.add_trace(go.Scatterpolar(
+        r=values,
+        theta=[entity_type for entity_type, _ in type_items],
+        fill='toself',
+        name='Distribution des Entités',
+        line_color='rgb(102, 126, 234)'
+    ))
+    
+    fig.update_layout(
+        polar=dict(
+            radialaxis=dict(
+                visible=True,
+                range=[0, max(values)]
+            )),
+        title="Distribution Radiale des Types d'Entités",
+        height=500
+    )
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def _build_confidence_histogram(confidence_values):
+    """Histogramme des niveaux de confiance"""
+    fig = px.histogram(
+        x=list(confidence_values),
+        nbins=20,
+        title="Distribution des Niveaux de Confiance",
+        labels={'x': 'Confiance', 'y': 'Nombre d\'entités'}
+    )
+    fig.update_layout(height=400)
+    return fig
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_ENTRIES)
+def _build_confidence_by_type_figure(average_items):
+    """Barres de confiance moyenne par type"""
+    fig = px.bar(
+        x=[entity_type for entity_type, _ in average_items],
+        y=[average for _, average in average_items],
+        title="Confiance Moyenne par Type",
+        labels={'x': 'Type d\'entité', 'y': 'Confiance moyenne'}
+    )
+    fig.update_layout(height=400)
+    return fig
+
+def enrich_entities_with_ai():
+    """Compléter une analyse regex par une passe IA sur le document original.
+
+    Seules les entités inédites (même type et même position absents) sont
+    ajoutées : les entités existantes et leurs modifications sont conservées.
+    Retourne le nombre d'entités ajoutées, ou ``None`` en cas d'échec.
+    """
+    original_path = st.session_state.get("original_file_path")
+    if not original_path or not os.path.exists(original_path):
+        st.warning("Document original indisponible. Veuillez réanalyser le document.")
+        return None
+
+    anonymizer = get_anonymizer()
+    with st.spinner("🤖 Analyse IA en cours..."):
+        with get_anonymizer_lock():
+            result = anonymizer.process_document(
+                original_path, "ai", st.session_state.confidence_threshold, audit=False
+            )
+    if result["status"] != "success":
+        st.error(f"❌ Erreur lors de l'analyse IA: {result.get('error', 'Erreur inconnue')}")
+        return None
+    metadata = result.get("metadata", {})
+    if metadata.get("detection_method") != "ai":
+        # ``detection_method`` reflète le chargement effectif du modèle : un
+        # modèle SpaCy introuvable au chargement laisse la détection aux regex
+        detail = metadata.get("ai_error", "modèle NER non chargé")
+        st.warning(f"⚠️ Aucune entité IA ajoutée : {detail}")
+        return None
+
+    preset = ANONYMIZATION_PRESETS.get(st.session_state.current_preset, ANONYMIZATION_PRESETS["standard"])
+    allowed_types = frozenset(preset["entity_types"])
+    manager = st.session_state.entity_manager
+    known = {(e["type"], e["start"], e["end"]) for e in manager.entities}
+    added = 0
+    for entity in result["entities"]:
+        signature = (entity["type"], entity["start"], entity["end"])
+        if entity["type"] in allowed_types and signature not in known:
+            known.add(signature)
+            manager.add_entity(entity)
+            added += 1
+
+    st.session_state.entities = manager.entities
+    st.session_state.last_processing_mode = "ai"
+    return added
+
 def display_results_advanced():
     """Affichage avancé des résultats"""
     if not st.session_state.entities:
@@ -717,9 +884,17 @@ def display_results_advanced():
     
     st.header("📊 Résultats de l'Analyse")
     
+    # Analyse IA à la demande après une première passe regex rapide
+    _, ner_available = DocumentAnonymizer.probe_ner_status()
+    if st.session_state.last_processing_mode == "regex" and ner_available:
+        if st.button("🤖 Enrichir avec IA", help="Ajoute les entités détectées par le modèle NER"):
+            added = enrich_entities_with_ai()
+            if added is not None:
+                st.success(f"✅ {added} nouvelle(s) entité(s) ajoutée(s) par l'IA")
+    
     # Statistiques générales
     entities = st.session_state.entities
-    stats = generate_anonymization_stats(entities, len(st.session_state.document_text))
+    stats = get_anonymization_stats(entities, len(st.session_state.document_text))
     
     # Métriques principales
     col1, col2, col3, col4, col5 = st.columns(5)
@@ -739,7 +914,8 @@ def display_results_advanced():
         )
     
     with col3:
-        mode_display = st.session_state.processing_mode.upper()
+        # Méthode réellement appliquée (regex à l'ingestion, IA après enrichissement)
+        mode_display = (st.session_state.last_processing_mode or "regex").upper()
         st.metric("Mode", mode_display)
     
     with col4:
@@ -762,63 +938,42 @@ def display_results_advanced():
         )
     
     # Graphique de répartition
-    if stats["entity_types"]:
+    if stats["entity_types"] and PLOTLY_SUPPORT:
         st.subheader("📈 Répartition par Types")
         
-        import plotly.express as px
-        import pandas as pd
-        
-        # Préparer les données pour le graphique
-        df = pd.DataFrame([
-            {"Type": entity_type, "Nombre": count, "Couleur": ENTITY_COLORS.get(entity_type, "#6c757d")}
-            for entity_type, count in stats["entity_types"].items()
-        ])
+        # Clé partagée barres/camembert
+        type_items = tuple(stats["entity_types"].items())
         
         # Graphique en barres coloré
-        fig = px.bar(
-            df, 
-            x="Type", 
-            y="Nombre",
-            color="Type",
-            color_discrete_map={row["Type"]: row["Couleur"] for _, row in df.iterrows()},
-            title="Distribution des Entités Détectées"
-        )
-        fig.update_layout(showlegend=False, height=400)
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(_build_type_bar_figure(type_items), use_container_width=True)
         
         # Graphique camembert
         col1, col2 = st.columns(2)
         
         with col1:
-            fig_pie = px.pie(
-                df, 
-                values="Nombre", 
-                names="Type",
-                color="Type",
-                color_discrete_map={row["Type"]: row["Couleur"] for _, row in df.iterrows()},
-                title="Répartition Proportionnelle"
-            )
-            fig_pie.update_layout(height=400)
-            st.plotly_chart(fig_pie, use_container_width=True)
+            st.plotly_chart(_build_type_pie_figure(type_items), use_container_width=True)
         
         with col2:
             # Tableau détaillé
             st.subheader("📋 Détail par Type")
             total = sum(stats["entity_types"].values())
             
+            # Un seul bloc HTML : un message Streamlit au lieu d'un par type
+            html_parts = []
             for entity_type, count in sorted(stats["entity_types"].items(), key=lambda x: x[1], reverse=True):
                 percentage = (count / total) * 100
                 color = ENTITY_COLORS.get(entity_type, "#6c757d")
                 
-                st.markdown(f"""
-                <div style="display: flex; align-items: center; margin: 0.5rem 0;">
-                    <span style="width: 20px; height: 20px; background-color: {color}; border-radius: 50%; margin-right: 10px;"></span>
-                    <span style="flex: 1;"><strong>{entity_type}</strong>: {count} ({percentage:.1f}%)</span>
-                </div>
-                """, unsafe_allow_html=True)
+                html_parts.append(
+                    f'<div style="display: flex; align-items: center; margin: 0.5rem 0;">'
+                    f'<span style="width: 20px; height: 20px; background-color: {color}; border-radius: 50%; margin-right: 10px;"></span>'
+                    f'<span style="flex: 1;"><strong>{entity_type}</strong>: {count} ({percentage:.1f}%)</span>'
+                    f'</div>'
+                )
+            st.markdown("".join(html_parts), unsafe_allow_html=True)
     
     # Statistiques de confiance (mode IA)
-    if stats["confidence_stats"] and st.session_state.processing_mode == "ai":
+    if stats["confidence_stats"] and st.session_state.last_processing_mode == "ai":
         st.subheader("🎯 Analyse de Confiance")
         
         conf_col1, conf_col2, conf_col3 = st.columns(3)
@@ -865,14 +1020,129 @@ def display_entity_manager_advanced():
 
     tabs = st.tabs(["Groupes", "Recherche"])
 
+    # Chaque onglet recopie lui-même l'état du gestionnaire dans la session
     with tabs[0]:
         display_groups_tab_advanced()
     with tabs[1]:
         display_search_tab_advanced()
 
-    # Mettre à jour les listes partagées
-    st.session_state.entities = st.session_state.entity_manager.entities
-    st.session_state.groups = st.session_state.entity_manager.groups
+def _synced_with_entity_manager(render):
+    """Mettre à jour les listes partagées à la fin du rendu d'un onglet.
+
+    Le rerun d'un fragment ne repasse pas par
+    ``display_entity_manager_advanced`` ; le ``finally`` couvre aussi les
+    ``st.rerun()`` qui interrompent le rendu.
+    """
+    @wraps(render)
+    def wrapper(*args, **kwargs):
+        try:
+            return render(*args, **kwargs)
+        finally:
+            st.session_state.entities = st.session_state.entity_manager.entities
+            st.session_state.groups = st.session_state.entity_manager.groups
+    return wrapper
+
+# Ligne d'un groupe dans la vue groupée : gabarit figé, seules les valeurs
+# (style de surlignage, identifiant, occurrences, variantes, représentant)
+# sont insérées à chaque rendu
+GROUP_ROW_TEMPLATE = (
+    "<div style='padding:5px;%s'>"
+    "<strong>%s</strong> "
+    "<span style='background-color:#0d6efd;color:white;"
+    "border-radius:10px;padding:2px 6px;margin-right:4px;'>"
+    "%s</span>"
+    "<span style='background-color:#6c757d;color:white;"
+    "border-radius:10px;padding:2px 6px;margin-right:4px;'>"
+    "%s variantes</span>"
+    "%s"
+    "</div>"
+)
+
+# Colonne et sens de tri de la vue en colonnes pour chaque option de tri
+ENTITY_SORT_COLUMNS = {
+    "position": ("start", True),
+    "type": ("type", True),
+    "confidence": ("confidence", False),
+    "value": ("value", True),
+}
+
+def _get_entity_columns(entities):
+    """Vue en colonnes des entités (type catégoriel, début, confiance, valeur
+    en minuscules) pour filtrer et trier sans parcourir les dictionnaires.
+
+    Reconstruite seulement quand le contenu des entités change ; ``None`` si
+    pandas n'est pas disponible.
+    """
+    if pd is None:
+        return None
+    key = _entities_content_key(entities)
+    cached = st.session_state.get("_entity_columns")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    frame = pd.DataFrame({
+        "type": pd.Categorical([entity["type"] for entity in entities]),
+        "start": pd.array([entity.get("start", 0) for entity in entities], dtype="int64"),
+        "confidence": pd.array([entity.get("confidence", 1.0) for entity in entities], dtype="float64"),
+        "value": [entity["value"].lower() for entity in entities],
+    })
+    st.session_state["_entity_columns"] = (key, frame)
+    return frame
+
+def _entity_types_in_order(entities):
+    """Types d'entités présents, dans l'ordre d'apparition"""
+    frame = _get_entity_columns(entities)
+    if frame is not None:
+        return frame["type"].unique().tolist()
+    return list(dict.fromkeys(e["type"] for e in entities))
+
+def _filter_and_sort_entity_indices(entities, selected_types, min_confidence, sort_by):
+    """Indices des entités filtrées puis triées.
+
+    Des indices (et non des copies) sont renvoyés : l'onglet modifie les
+    entités en place.
+    """
+    frame = _get_entity_columns(entities)
+    if frame is not None:
+        # Masque et tri vectorisés sur la vue en colonnes
+        frame = frame[frame["type"].isin(selected_types) & (frame["confidence"] >= min_confidence)]
+        column, ascending = ENTITY_SORT_COLUMNS.get(sort_by, (None, True))
+        if column is not None:
+            frame = frame.sort_values(column, ascending=ascending, kind="stable")
+        return frame.index.tolist()
+
+    allowed_types = frozenset(selected_types)
+    indices = [
+        i for i, entity in enumerate(entities)
+        if entity["type"] in allowed_types and entity.get("confidence", 1.0) >= min_confidence
+    ]
+    
+    # Tri
+    if sort_by == "position":
+        indices.sort(key=lambda i: entities[i].get("start", 0))
+    elif sort_by == "type":
+        indices.sort(key=lambda i: entities[i]["type"])
+    elif sort_by == "confidence":
+        indices.sort(key=lambda i: entities[i].get("confidence", 1.0), reverse=True)
+    elif sort_by == "value":
+        indices.sort(key=lambda i: entities[i]["value"].lower())
+    return indices
+
+def _build_entities_table(entities, selected_ids, select_all):
+    """Table éditable des entités filtrées (une ligne par entité) ; ``None``
+    si pandas n'est pas disponible."""
+    if pd is None:
+        return None
+    return pd.DataFrame({
+        "id": [e["id"] for e in entities],
+        "Sélection": [select_all or e["id"] in selected_ids for e in entities],
+        "Type": [e["type"] for e in entities],
+        "Valeur": [e["value"] for e in entities],
+        "Position": [f"{e['start']}-{e['end']}" for e in entities],
+        "Confiance": pd.array([e.get("confidence") for e in entities], dtype="Float64"),
+        "Remplacement": [e.get("replacement", f"[{e['type']}]") for e in entities],
+        "Contexte": [e.get("context") or "" for e in entities],
+    })
 
 def display_entities_tab_advanced():
     """Onglet entités avec fonctionnalités avancées"""
@@ -954,17 +1224,15 @@ def display_entities_tab_advanced():
             highlight_style = (
                 "background-color:#fff3cd;" if highlight else ""
             )
+            # Les valeurs viennent du document : échappées avant insertion
             st.markdown(
-                f"<div style='padding:5px;{highlight_style}'>"
-                f"<strong>{gid}</strong> "
-                f"<span style='background-color:#0d6efd;color:white;"
-                f"border-radius:10px;padding:2px 6px;margin-right:4px;'>"
-                f"{grp['total_occurrences']}</span>"
-                f"<span style='background-color:#6c757d;color:white;"
-                f"border-radius:10px;padding:2px 6px;margin-right:4px;'>"
-                f"{variant_count} variantes</span>"
-                f"{representative}"
-                f"</div>",
+                GROUP_ROW_TEMPLATE % (
+                    highlight_style,
+                    html.escape(str(gid)),
+                    grp['total_occurrences'],
+                    variant_count,
+                    html.escape(representative),
+                ),
                 unsafe_allow_html=True,
             )
 
@@ -1029,8 +1297,8 @@ def display_entities_tab_advanced():
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        # Filtre par type
-        entity_types = list(set([e["type"] for e in st.session_state.entities]))
+        # Filtre par type (ordre d'apparition stable d'un rerun à l'autre)
+        entity_types = _entity_types_in_order(st.session_state.entities)
         selected_types = st.multiselect(
             "Filtrer par type:",
             entity_types,
@@ -1040,7 +1308,7 @@ def display_entities_tab_advanced():
     
     with col2:
         # Filtre par confiance
-        if st.session_state.processing_mode == "ai":
+        if st.session_state.last_processing_mode == "ai":
             min_confidence = st.slider(
                 "Confiance minimale:",
                 0.0, 1.0, 0.0, 0.1,
@@ -1074,22 +1342,10 @@ def display_entities_tab_advanced():
             if st.button("📁 Grouper sélectionnés", key="group_selected"):
                 st.session_state.show_group_dialog = True
     
-    # Filtrer et trier les entités
-    filtered_entities = []
-    for entity in st.session_state.entities:
-        if (entity["type"] in selected_types and 
-            entity.get("confidence", 1.0) >= min_confidence):
-            filtered_entities.append(entity)
-    
-    # Tri
-    if sort_by == "position":
-        filtered_entities.sort(key=lambda x: x.get("start", 0))
-    elif sort_by == "type":
-        filtered_entities.sort(key=lambda x: x["type"])
-    elif sort_by == "confidence":
-        filtered_entities.sort(key=lambda x: x.get("confidence", 1.0), reverse=True)
-    elif sort_by == "value":
-        filtered_entities.sort(key=lambda x: x["value"].lower())
+    # Filtrer et trier les entités (masques sur la vue en colonnes)
+    entities = st.session_state.entities
+    order = _filter_and_sort_entity_indices(entities, selected_types, min_confidence, sort_by)
+    filtered_entities = [entities[i] for i in order]
     
     # Affichage des entités avec sélection
     if filtered_entities:
@@ -1098,91 +1354,53 @@ def display_entities_tab_advanced():
         # Sélection globale
         select_all = st.checkbox("Sélectionner tout", key="select_all_entities")
         
-        selected_entities = []
+        # Un seul widget table pour toutes les entités : la grille n'affiche
+        # que les lignes visibles. La clé dépend de l'ordre affiché, pour que
+        # les modifications en attente ne glissent pas sur d'autres lignes
+        # après un changement de filtre ou de tri.
+        selected_ids = st.session_state.setdefault("selected_entity_ids", set())
+        table = _build_entities_table(filtered_entities, selected_ids, select_all)
+        if table is None:
+            # Sans pandas : liste en lecture seule, sélection inchangée
+            st.warning("⚠️ pandas indisponible : édition des entités désactivée.")
+            for entity in filtered_entities:
+                st.write(f"- {entity['type']}: {entity['value']}")
+        else:
+            edited = st.data_editor(
+                table,
+                key=f"entities_editor_{hash(tuple(order))}",
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "id": None,
+                    "Sélection": st.column_config.CheckboxColumn(required=False),
+                    "Confiance": st.column_config.ProgressColumn(
+                        min_value=0.0, max_value=1.0, format="%.2f"
+                    ),
+                    "Remplacement": st.column_config.TextColumn(
+                        help="Remplacement personnalisé de l'entité"
+                    ),
+                },
+                disabled=["Type", "Valeur", "Position", "Confiance", "Contexte"],
+            )
         
-        for i, entity in enumerate(filtered_entities):
-            # Container pour chaque entité
-            with st.container():
-                entity_col1, entity_col2 = st.columns([1, 4])
-                
-                with entity_col1:
-                    # Checkbox de sélection
-                    is_selected = st.checkbox(
-                        "Sélectionner l'entité",
-                        value=select_all,
-                        key=f"select_entity_{i}_{entity['id']}",
-                        label_visibility="collapsed",
-                    )
-                    if is_selected:
-                        selected_entities.append(entity)
-                
-                with entity_col2:
-                    # Informations de l'entité
-                    with st.expander(
-                        f"{entity['type']}: {entity['value'][:50]}{'...' if len(entity['value']) > 50 else ''}",
-                        expanded=False
-                    ):
-                        # Détails de l'entité
-                        detail_col1, detail_col2 = st.columns([2, 1])
-                        
-                        with detail_col1:
-                            st.write(f"**Valeur:** `{entity['value']}`")
-                            st.write(f"**Type:** {entity['type']}")
-                            st.write(f"**Position:** {entity['start']}-{entity['end']}")
-                            
-                            if "confidence" in entity and entity["confidence"] is not None:
-                                conf_percent = entity["confidence"] * 100
-                                st.write(f"**Confiance:** {conf_percent:.1f}%")
-                                
-                                # Barre de confiance visuelle
-                                st.markdown(f"""
-                                <div style="background: #e9ecef; border-radius: 10px; height: 20px; margin: 10px 0;">
-                                    <div style="background: linear-gradient(90deg, #dc3545 0%, #ffc107 50%, #28a745 100%); 
-                                                width: {conf_percent}%; height: 100%; border-radius: 10px;">
-                                    </div>
-                                </div>
-                                """, unsafe_allow_html=True)
-                            
-                            # Contexte si disponible
-                            if "context" in entity and entity["context"]:
-                                with st.expander("📄 Contexte"):
-                                    st.markdown(entity["context"])
-                            
-                            # Modification du remplacement
-                            new_replacement = st.text_input(
-                                "Remplacement personnalisé:",
-                                value=entity.get('replacement', f"[{entity['type']}]"),
-                                key=f"replacement_{i}_{entity['id']}"
-                            )
-                            
-                            if new_replacement != entity.get('replacement'):
-                                entity['replacement'] = new_replacement
-                                st.session_state.entity_manager.update_entity(
-                                    entity['id'], 
-                                    {"replacement": new_replacement}
-                                )
-                        
-                        with detail_col2:
-                            # Actions individuelles
-                            if st.button("🗑️ Supprimer", key=f"delete_{i}_{entity['id']}"):
-                                st.session_state.entities.remove(entity)
-                                st.session_state.entity_manager.delete_entity(entity['id'])
-                                st.rerun()
-                            
-                            if st.button("📋 Copier valeur", key=f"copy_{i}_{entity['id']}"):
-                                st.session_state.clipboard = entity['value']
-                                st.success("Copié!")
-                            
-                            # Badge de type coloré
-                            color = ENTITY_COLORS.get(entity['type'], "#6c757d")
-                            st.markdown(f"""
-                            <span class="entity-badge" style="background-color: {color};">
-                                {entity['type']}
-                            </span>
-                            """, unsafe_allow_html=True)
+            # Sélection conservée par identifiant (y compris hors filtre courant)
+            selected_ids.difference_update(table["id"])
+            selected_ids.update(edited.loc[edited["Sélection"].fillna(False).astype(bool), "id"])
+        
+            # Remplacements modifiés : écrits en une passe, seulement pour les
+            # lignes réellement changées (une cellule vidée est ignorée)
+            changed = edited["Remplacement"].notna() & (edited["Remplacement"] != table["Remplacement"])
+            if changed.any():
+                entities_by_id = {e["id"]: e for e in filtered_entities}
+                for entity_id, replacement in zip(edited.loc[changed, "id"], edited.loc[changed, "Remplacement"]):
+                    entities_by_id[entity_id]["replacement"] = replacement
+                    st.session_state.entity_manager.update_entity(entity_id, {"replacement": replacement})
         
         # Stocker les entités sélectionnées
-        st.session_state.selected_entities = selected_entities
+        st.session_state.selected_entities = [
+            e for e in filtered_entities if e['id'] in selected_ids
+        ]
 
         if st.session_state.get("show_delete_confirmation"):
             with st.expander("Confirmer la suppression", expanded=True):
@@ -1200,6 +1418,7 @@ def display_entities_tab_advanced():
                         ]
                         st.session_state.show_delete_confirmation = False
                         st.session_state.selected_entities = []
+                        selected_ids.clear()
                         st.rerun()
                 with cancel_col:
                     if st.button("❌ Annuler", key="cancel_delete"):
@@ -1208,6 +1427,26 @@ def display_entities_tab_advanced():
     else:
         st.info("Aucune entité ne correspond aux critères de filtrage.")
 
+def _get_entity_labels(entities):
+    """Libellés tronqués ``TYPE: valeur`` des entités, indexés par identifiant.
+
+    Reconstruits seulement quand le contenu des entités change, comme la
+    table de recherche des entités.
+    """
+    key = _entities_content_key(entities)
+    cached = st.session_state.get("_entity_labels")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    labels = {
+        e['id']: f"{e['type']}: {e['value'][:30]}{'...' if len(e['value']) > 30 else ''}"
+        for e in entities
+    }
+    st.session_state["_entity_labels"] = (key, labels)
+    return labels
+
+@st_fragment
+@_synced_with_entity_manager
 def display_groups_tab_advanced():
     """Onglet groupes avec fonctionnalités avancées"""
     st.subheader("👥 Gestion des Groupes")
@@ -1221,15 +1460,14 @@ def display_groups_tab_advanced():
             group_description = st.text_area("Description:", key="new_group_description")
         
         with group_col2:
-            # Sélection d'entités pour le groupe
-            available_entities = [
-                f"{e['type']}: {e['value'][:30]}{'...' if len(e['value']) > 30 else ''}"
-                for e in st.session_state.entities
-            ]
+            # Sélection d'entités pour le groupe : les options sont les
+            # identifiants (uniques), les libellés tronqués servent à l'affichage
+            available_entities = _get_entity_labels(st.session_state.entities)
             
             selected_for_group = st.multiselect(
                 "Entités à inclure:",
-                available_entities,
+                list(available_entities),
+                format_func=available_entities.get,
                 key="entities_for_new_group"
             )
             
@@ -1238,20 +1476,16 @@ def display_groups_tab_advanced():
             if st.button("📧 Groupe Emails"):
                 group_name = "Adresses Email"
                 group_description = "Toutes les adresses email détectées"
-                selected_for_group = [e for e in available_entities if "EMAIL:" in e]
+                selected_for_group = [e['id'] for e in st.session_state.entities if e['type'] == "EMAIL"]
             
             if st.button("👤 Groupe Personnes"):
                 group_name = "Personnes"
                 group_description = "Noms et identités de personnes"
-                selected_for_group = [e for e in available_entities if "PERSON:" in e]
+                selected_for_group = [e['id'] for e in st.session_state.entities if e['type'] == "PERSON"]
         
         if st.button("✨ Créer le groupe", type="primary"):
             if group_name and selected_for_group:
-                # Obtenir les IDs des entités sélectionnées
-                entity_ids = []
-                for i, entity_display in enumerate(available_entities):
-                    if entity_display in selected_for_group:
-                        entity_ids.append(st.session_state.entities[i]['id'])
+                entity_ids = list(selected_for_group)
                 
                 group_id = st.session_state.entity_manager.create_group(
                     group_name, group_description, entity_ids
@@ -1268,6 +1502,22 @@ def display_groups_tab_advanced():
         groups, entity_manager=st.session_state.entity_manager, language="fr"
     )
 
+# Recherches rapides prédéfinies, compilées une fois au chargement
+QUICK_SEARCHES = {
+    "📧 Emails": re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'),
+    "📞 Téléphones": re.compile(r'(?:\+33|0)[1-9](?:[0-9\s.-]{8,})'),
+    "🏠 Adresses": re.compile(r'\b\d+\s+[A-Za-z\s]+(?:rue|avenue|boulevard)'),
+    "💳 IBAN": re.compile(r'\b[A-Z]{2}\d{2}[A-Z0-9]+\b'),
+    "👤 Noms": re.compile(r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b'),
+}
+# Toutes les recherches rapides en une seule alternance : un seul parcours du
+# document au lieu d'un par motif
+QUICK_SEARCHES["🔎 Tout"] = re.compile(
+    "|".join(f"(?:{pattern.pattern})" for pattern in QUICK_SEARCHES.values())
+)
+
+@st_fragment
+@_synced_with_entity_manager
 def display_search_tab_advanced():
     """Onglet recherche avancée"""
     st.subheader("🔍 Recherche Avancée")
@@ -1297,17 +1547,9 @@ def display_search_tab_advanced():
         # Recherche rapide prédéfinie
         st.write("**Recherches rapides:**")
         
-        quick_searches = {
-            "📧 Emails": r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b',
-            "📞 Téléphones": r'(?:\+33|0)[1-9](?:[0-9\s.-]{8,})',
-            "🏠 Adresses": r'\b\d+\s+[A-Za-z\s]+(?:rue|avenue|boulevard)',
-            "💳 IBAN": r'\b[A-Z]{2}\d{2}[A-Z0-9]+\b',
-            "👤 Noms": r'\b[A-Z][a-z]+\s+[A-Z][a-z]+\b'
-        }
-        
-        for label, pattern in quick_searches.items():
+        for label, pattern in QUICK_SEARCHES.items():
             if st.button(label, key=f"quick_search_{label}"):
-                st.session_state.search_query = pattern
+                st.session_state.search_query = pattern.pattern
                 st.session_state.use_regex_search = True
                 st.rerun()
     
@@ -1324,22 +1566,93 @@ def display_search_tab_advanced():
         
         if results:
             first_result = results[0]
-            st.success(f"✅ {len(results)} occurrence(s) trouvée(s)")
-
-            highlighted_text = first_result['text'].replace(
-                first_result['match'],
-                f'<span class="highlight-text">{first_result["match"]}</span>'
-            )
+            if len(results) >= SEARCH_MAX_RESULTS:
+                st.success(f"✅ Au moins {SEARCH_MAX_RESULTS} occurrences trouvées (recherche limitée)")
+            else:
+                st.success(f"✅ {len(results)} occurrence(s) trouvée(s)")
 
-            st.markdown(f"**Contexte:** {highlighted_text}", unsafe_allow_html=True)
+            st.markdown(f"**Contexte:** {_highlight_result(first_result)}", unsafe_allow_html=True)
             st.write(f"**Position:** {first_result['start']}-{first_result['end']}")
         else:
             st.warning("Aucun résultat trouvé.")
 
-def perform_advanced_search(text, query, case_sensitive, whole_words, use_regex, search_entities):
-    """Effectuer une recherche avancée dans le texte"""
-    import re
-    
+def _get_entity_search_frame(entities):
+    """Textes ``TYPE: valeur`` des entités (et version minuscule) pour la recherche.
+
+    Reconstruit seulement quand le contenu des entités change ; ``None`` si
+    pandas n'est pas disponible.
+    """
+    if pd is None:
+        return None
+    key = _entities_content_key(entities)
+    cached = st.session_state.get("_entity_search_frame")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    texts = [f"{e['type']}: {e['value']}" for e in entities]
+    frame = pd.DataFrame({"text": texts, "text_lower": [t.lower() for t in texts]})
+    st.session_state["_entity_search_frame"] = (key, frame)
+    return frame
+
+# Nombre maximal de résultats collectés par recherche
+SEARCH_MAX_RESULTS = 50
+
+def _get_line_starts(text):
+    """Positions de début de ligne du document, calculées une fois par texte"""
+    # Le hash d'une chaîne est mémorisé par l'objet : clé sûre et gratuite
+    # une fois calculée
+    key = (len(text), hash(text))
+    cached = st.session_state.get("_line_starts")
+    if cached is not None and cached[0] == key:
+        return cached[1]
+
+    line_starts = [0]
+    newline = text.find('\n')
+    while newline != -1:
+        line_starts.append(newline + 1)
+        newline = text.find('\n', newline + 1)
+    st.session_state["_line_starts"] = (key, line_starts)
+    return line_starts
+
+def _iter_text_matches(text, compiled):
+    """Générer les résultats de ``compiled`` dans le texte entier, à la demande.
+
+    Le numéro de ligne est retrouvé par dichotomie sur les débuts de ligne.
+    """
+    line_starts = _get_line_starts(text)
+    
+    for match in compiled.finditer(text):
+        line_num = bisect.bisect_right(line_starts, match.start())
+        line_start = line_starts[line_num - 1]
+        line_end = line_starts[line_num] - 1 if line_num < len(line_starts) else len(text)
+        yield {
+            'line': line_num,
+            'text': text[line_start:line_end],
+            'match': match.group(),
+            'start': match.start(),
+            'end': match.end(),
+            'offset': match.start() - line_start
+        }
+
+def _highlight_result(result):
+    """Ligne (ou entité) du résultat, échappée, avec l'occurrence surlignée"""
+    text, match = result['text'], result['match']
+    offset = result.get('offset')
+    if offset is None:
+        # Résultat d'entité : première occurrence, sans tenir compte de la casse
+        offset = text.lower().find(match.lower())
+    if offset < 0 or not match:
+        return html.escape(text)
+    end = offset + len(match)
+    return (
+        f'{html.escape(text[:offset])}'
+        f'<span class="highlight-text">{html.escape(text[offset:end])}</span>'
+        f'{html.escape(text[end:])}'
+    )
+
+def perform_advanced_search(text, query, case_sensitive, whole_words, use_regex, search_entities,
+                            max_results=SEARCH_MAX_RESULTS):
+    """Effectuer une recherche avancée dans le texte (au plus ``max_results`` résultats)"""
     results = []
     
     try:
@@ -1353,43 +1666,48 @@ def perform_advanced_search(text, query, case_sensitive, whole_words, use_regex,
             if whole_words:
                 pattern = r'\b' + pattern + r'\b'
         
-        # Flags de recherche
-        flags = 0 if case_sensitive else re.IGNORECASE
-        
-        # Recherche dans le texte
-        lines = text.split('\n')
-        char_offset = 0
+        # Flags de recherche (MULTILINE : ``^``/``$`` restent ancrés aux lignes)
+        flags = re.MULTILINE if case_sensitive else re.MULTILINE | re.IGNORECASE
         
-        for line_num, line in enumerate(lines, 1):
-            try:
-                for match in re.finditer(pattern, line, flags):
-                    results.append({
-                        'line': line_num,
-                        'text': line,
-                        'match': match.group(),
-                        'start': char_offset + match.start(),
-                        'end': char_offset + match.end()
-                    })
-            except re.error:
-                # Pattern regex invalide
-                break
-            
-            char_offset += len(line) + 1  # +1 pour le \n
-        
-        # Recherche dans les entités si activée
-        if search_entities and st.session_state.entities:
-            for entity in st.session_state.entities:
-                entity_text = f"{entity['type']}: {entity['value']}"
-                if (case_sensitive and query in entity_text) or \
-                   (not case_sensitive and query.lower() in entity_text.lower()):
-                    results.append({
-                        'line': 'Entité',
-                        'text': entity_text,
-                        'match': query,
-                        'start': entity.get('start', 0),
-                        'end': entity.get('end', 0),
-                        'entity_id': entity['id']
-                    })
+        # Compilation unique ; un pattern invalide échoue ici, avant la boucle
+        try:
+            compiled = re.compile(pattern, flags)
+        except re.error:
+            # Pattern regex invalide
+            compiled = None
+        
+        # Recherche dans le texte entier en une passe, arrêtée dès la limite
+        if compiled is not None:
+            results.extend(islice(_iter_text_matches(text, compiled), max_results))
+        
+        # Recherche dans les entités si activée (dans la limite restante)
+        if search_entities and st.session_state.entities and len(results) < max_results:
+            entities = st.session_state.entities
+            entity_texts = _get_entity_search_frame(entities)
+            if entity_texts is not None:
+                # Recherche vectorisée sur les textes précalculés
+                if case_sensitive:
+                    mask = entity_texts["text"].str.contains(query, regex=False)
+                else:
+                    mask = entity_texts["text_lower"].str.contains(query.lower(), regex=False)
+                matches = ((entities[i], entity_texts["text"].iat[i]) for i in mask.to_numpy().nonzero()[0])
+            else:
+                needle = query if case_sensitive else query.lower()
+                matches = []
+                for entity in entities:
+                    entity_text = f"{entity['type']}: {entity['value']}"
+                    haystack = entity_text if case_sensitive else entity_text.lower()
+                    if needle in haystack:
+                        matches.append((entity, entity_text))
+            for entity, entity_text in islice(matches, max_results - len(results)):
+                results.append({
+                    'line': 'Entité',
+                    'text': entity_text,
+                    'match': query,
+                    'start': entity.get('start', 0),
+                    'end': entity.get('end', 0),
+                    'entity_id': entity['id']
+                })
     
     except ValueError as e:
         # Handle invalid search parameters
@@ -1405,8 +1723,12 @@ def display_analysis_tab():
         st.info("Aucune donnée à analyser.")
         return
     
-    # Statistiques globales
-    stats = st.session_state.entity_manager.get_statistics()
+    # Statistiques globales : même calcul mémorisé que la section résultats,
+    # les entités ne sont pas reparcourues à chaque rerun
+    entities = st.session_state.entities
+    doc_length = len(st.session_state.document_text)
+    stats_key = _entities_stats_key(entities)
+    stats = _cached_anonymization_stats(stats_key, doc_length, entities)
     
     # Métriques avancées
     col1, col2, col3 = st.columns(3)
@@ -1424,92 +1746,48 @@ def display_analysis_tab():
             st.metric("Confiance Maximale", f"{stats['confidence_stats']['max']:.0%}")
     
     with col3:
-        doc_length = len(st.session_state.document_text)
         entity_density = (stats['total_entities'] / doc_length * 1000) if doc_length > 0 else 0
         st.metric("Densité", f"{entity_density:.1f}/1k chars")
 
-        coverage_percent = calculate_text_coverage(st.session_state.entities, doc_length)
-        st.metric("Couverture", f"{coverage_percent:.1f}%")
+        st.metric("Couverture", f"{stats['coverage_percentage']:.1f}%")
     
     # Analyse de distribution
     st.subheader("📈 Distribution et Tendances")
     
     # Graphique de distribution des types
-    if stats['entity_types']:
-        import plotly.graph_objects as go
-        
+    if stats['entity_types'] and PLOTLY_SUPPORT:
         # Graphique radar des types d'entités
-        categories = list(stats['entity_types'].keys())
-        values = list(stats['entity_types'].values())
-        
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatterpolar(
-            r=values,
-            theta=categories,
-            fill='toself',
-            name='Distribution des Entités',
-            line_color='rgb(102, 126, 234)'
-        ))
-        
-        fig.update_layout(
-            polar=dict(
-                radialaxis=dict(
-                    visible=True,
-                    range=[0, max(values)]
-                )),
-            title="Distribution Radiale des Types d'Entités",
-            height=500
+        st.plotly_chart(
+            _build_type_radar_figure(tuple(stats['entity_types'].items())),
+            use_container_width=True
         )
-        
-        st.plotly_chart(fig, use_container_width=True)
     
     # Analyse de confiance (si mode IA)
-    if st.session_state.processing_mode == "ai" and stats['confidence_stats']:
+    if st.session_state.last_processing_mode == "ai" and stats['confidence_stats'] and PLOTLY_SUPPORT:
         st.subheader("🎯 Analyse de Confiance Détaillée")
         
         confidence_col1, confidence_col2 = st.columns(2)
         
+        # Agrégats de confiance, recalculés seulement si les entités changent
+        confidence_values, avg_confidence_by_type = _cached_confidence_breakdown(
+            stats_key, entities
+        )
+        
         with confidence_col1:
             # Distribution de confiance
-            confidence_values = [e.get('confidence', 1.0) for e in st.session_state.entities if 'confidence' in e]
-            
             if confidence_values:
-                import plotly.express as px
-                
-                fig_hist = px.histogram(
-                    x=confidence_values,
-                    nbins=20,
-                    title="Distribution des Niveaux de Confiance",
-                    labels={'x': 'Confiance', 'y': 'Nombre d\'entités'}
+                st.plotly_chart(
+                    _build_confidence_histogram(confidence_values),
+                    use_container_width=True
                 )
-                fig_hist.update_layout(height=400)
-                st.plotly_chart(fig_hist, use_container_width=True)
         
         with confidence_col2:
-            # Confiance par type
-            confidence_by_type = {}
-            for entity in st.session_state.entities:
-                if 'confidence' in entity:
-                    entity_type = entity['type']
-                    if entity_type not in confidence_by_type:
-                        confidence_by_type[entity_type] = []
-                    confidence_by_type[entity_type].append(entity['confidence'])
-            
-            if confidence_by_type:
-                avg_confidence_by_type = {
-                    entity_type: sum(confidences) / len(confidences)
-                    for entity_type, confidences in confidence_by_type.items()
-                }
-                
-                fig_bar = px.bar(
-                    x=list(avg_confidence_by_type.keys()),
-                    y=list(avg_confidence_by_type.values()),
-                    title="Confiance Moyenne par Type",
-                    labels={'x': 'Type d\'entité', 'y': 'Confiance moyenne'}
+            # Confiance moyenne par type
+            if avg_confidence_by_type:
+                st.plotly_chart(
+                    _build_confidence_by_type_figure(avg_confidence_by_type),
+                    use_container_width=True
                 )
-                fig_bar.update_layout(height=400)
-                st.plotly_chart(fig_bar, use_container_width=True)
     
     # Détection de conflits et anomalies
     st.subheader("⚠️ Détection d'Anomalies")
@@ -1542,6 +1820,29 @@ def display_analysis_tab():
     else:
         st.success("✅ Intégrité des données vérifiée")
 
+# Nombre de caractères du document montrés dans l'aperçu d'export
+EXPORT_PREVIEW_LENGTH = 500
+
+def build_export_preview(text: str, entities: list, limit: int = EXPORT_PREVIEW_LENGTH) -> str:
+    """Construire l'aperçu anonymisé des premiers caractères en un seul parcours.
+    
+    Les positions restent celles du texte original : les entités sont
+    triées par début et les chevauchements ignorés.
+    """
+    pieces = []
+    cursor = 0
+    for entity in sorted(
+        (e for e in entities if e['start'] < limit), key=lambda e: e['start']
+    ):
+        if entity['start'] < cursor:
+            continue
+        replacement = entity.get('replacement', f"[{entity['type']}]")
+        pieces.append(text[cursor:entity['start']])
+        pieces.append(f"**{replacement}**")
+        cursor = entity['end']
+    pieces.append(text[cursor:limit])
+    return "".join(pieces)
+
 def display_export_section_advanced():
     """Section d'export avancée"""
     if not st.session_state.entities:
@@ -1633,12 +1934,13 @@ def display_export_section_advanced():
 
                 # Exporter en utilisant le fichier original
                 anonymizer = get_anonymizer()
-                export_result = anonymizer.export_anonymized_document(
-                    original_path,
-                    st.session_state.entities,
-                    export_options,
-                    audit=audit_flag,
-                )
+                with get_anonymizer_lock():
+                    export_result = anonymizer.export_anonymized_document(
+                        original_path,
+                        st.session_state.entities,
+                        export_options,
+                        audit=audit_flag,
+                    )
 
                 if isinstance(export_result, dict):
                     output_path = export_result.get("output_path")
@@ -1649,16 +1951,16 @@ def display_export_section_advanced():
 
                 # Téléchargement
                 if temp_path and os.path.exists(temp_path):
-                    with open(temp_path, "rb") as f:
-                        file_content = f.read()
-
+                    # Le fichier ouvert est transmis tel quel : Streamlit le lit
+                    # une seule fois, sans copie intermédiaire dans le script
                     file_name = f"anonymized_{Path(original_path).stem}.{export_format}"
-                    st.download_button(
-                        "⬇️ Télécharger le document anonymisé",
-                        file_content,
-                        file_name=file_name,
-                        mime=f"application/{export_format}"
-                    )
+                    with open(temp_path, "rb") as exported_file:
+                        st.download_button(
+                            "⬇️ Télécharger le document anonymisé",
+                            exported_file,
+                            file_name=file_name,
+                            mime=f"application/{export_format}"
+                        )
                     if output_path and output_path != temp_path:
                         st.success(
                             f"📁 Fichier exporté dans le dossier personnalisé :\n`{output_path}`"
@@ -1698,16 +2000,7 @@ def display_export_section_advanced():
         # Aperçu rapide
         with st.expander("👁️ Aperçu"):
             st.write("Exemple de texte anonymisé:")
-            sample_text = st.session_state.document_text[:500]
-            for entity in st.session_state.entities:
-                if entity['start'] < 500:
-                    replacement = entity.get('replacement', f"[{entity['type']}]")
-                    sample_text = (
-                        sample_text[:entity['start']] +
-                        f"**{replacement}**" +
-                        sample_text[entity['end']:]
-                    )
-            st.markdown(f"{sample_text}...")
+            st.markdown(f"{build_export_preview(st.session_state.document_text, st.session_state.entities)}...")
 
 # === PROGRAMME PRINCIPAL ===
 def main():
@@ -10,6 +10,7 @@ import logging
 import argparse
 import subprocess
 from pathlib import Path
+from importlib.util import find_spec
 
 def setup_logging():
     """Configuration du logging"""
@@ -24,19 +25,19 @@ def setup_logging():
 
 def check_dependencies():
     """Vérifier les dépendances critiques"""
-    required_packages = [
-        'streamlit',
-        'python-docx',
-        'pdfplumber', 
-        'pdf2docx'
-    ]
+    # Nom du paquet pip -> nom du module importable
+    required_packages = {
+        'streamlit': 'streamlit',
+        'python-docx': 'docx',
+        'pdfplumber': 'pdfplumber',
+        'pdf2docx': 'pdf2docx'
+    }
     
-    missing = []
-    for package in required_packages:
-        try:
-            __import__(package.replace('-', '_'))
-        except ImportError:
-            missing.append(package)
+    # find_spec localise le module sans exécuter son code
+    missing = [
+        package for package, module in required_packages.items()
+        if find_spec(module) is None
+    ]
     
     if missing:
         print(f"❌ Dépendances manquantes: {', '.join(missing)}")
@@ -56,10 +57,9 @@ def check_optional_dependencies():
     }
     
     for package, message in optional_packages.items():
-        try:
-            __import__(package)
+        if find_spec(package) is not None:
             print(f"✅ {package} disponible")
-        except ImportError:
+        else:
             print(f"⚠️ {package} manquant - {message}")
 
 def create_directories():
@@ -202,6 +202,7 @@ def main():
     # Vérifications préliminaires
     print("\n🔍 VÉRIFICATIONS SYSTÈME:")
     
+    # Sondage par find_spec : quelques millisecondes, sans importer les paquets
     if not check_dependencies():
         sys.exit(1)
     
@@ -0,0 +1,116 @@
+"""
+Réglage du parallélisme natif (OpenMP, MKL, PyTorch) partagé par l'application.
+
+L'application Streamlit tourne dans un seul processus : limiter OpenMP/MKL
+à un thread bride l'inférence NER d'un facteur égal au nombre de cœurs. Le
+nombre de threads est donc dérivé des cœurs physiques, divisé par le nombre
+de processus lancés sur la machine (``NPROC_PER_NODE``). Seuls les processus
+de travail lancés par l'application elle-même se limitent à un thread.
+"""
+
+import contextlib
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, Iterator, Optional
+
+# Variables lues par les bibliothèques natives au moment de leur import
+THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def compute_num_threads() -> int:
+    """Nombre de threads natifs par processus : cœurs physiques / processus par nœud"""
+    try:
+        import psutil
+        cores = psutil.cpu_count(logical=False)
+    except ImportError:  # pragma: no cover - psutil fait partie des dépendances
+        cores = None
+    cores = cores or os.cpu_count() or 1
+
+    try:
+        nproc_per_node = int(os.environ.get("NPROC_PER_NODE", "1"))
+    except ValueError:
+        nproc_per_node = 1
+    return max(1, cores // max(1, nproc_per_node))
+
+
+def apply_thread_env(num_threads: Optional[int] = None) -> Dict[str, str]:
+    """Renseigner les variables de threads sans écraser un réglage explicite.
+
+    Doit être appelé avant l'import de torch/numpy pour être pris en compte.
+    Retourne les valeurs effectivement en vigueur.
+    """
+    value = str(num_threads or compute_num_threads())
+    return {name: os.environ.setdefault(name, value) for name in THREAD_ENV_VARS}
+
+
+_threads_configured = False
+_threads_lock = threading.Lock()
+
+
+def once(num_threads: Optional[int] = None) -> bool:
+    """Fixer les threads PyTorch une seule fois par processus.
+
+    ``set_num_interop_threads`` n'est accepté qu'avant tout calcul
+    autograd/JIT : centraliser l'appel garantit cet ordre. Les appels
+    suivants ne font rien. Retourne ``False`` si PyTorch est absent.
+    """
+    global _threads_configured
+    if _threads_configured:
+        return True
+
+    with _threads_lock:
+        if _threads_configured:
+            return True
+        try:
+            import torch
+        except ImportError:
+            return False
+
+        torch.set_num_threads(num_threads or compute_num_threads())
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Déjà fixé, ou travail parallèle déjà démarré dans ce processus
+            pass
+        _threads_configured = True
+    return True
+
+
+@lru_cache(maxsize=None)
+def cpu_bf16_supported() -> bool:
+    """Le CPU exécute-t-il le bf16 nativement (AVX512-BF16, AMX) ?
+
+    Sans support matériel, l'autocast bf16 est émulé et plus lent que le fp32.
+    """
+    try:
+        import torch
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (ImportError, AttributeError, RuntimeError):
+        return False
+
+
+@contextlib.contextmanager
+def inference_context() -> Iterator[None]:
+    """Contexte des appels NER : ``inference_mode`` et autocast bf16 si possible.
+
+    ``inference_mode`` supprime aussi le suivi des versions de tenseurs que
+    conserve ``set_grad_enabled(False)``. Sans PyTorch, le contexte est neutre.
+    """
+    try:
+        import torch
+    except ImportError:
+        yield
+        return
+
+    with contextlib.ExitStack() as stack:
+        stack.enter_context(torch.inference_mode())
+        if cpu_bf16_supported():
+            stack.enter_context(torch.autocast(device_type="cpu", dtype=torch.bfloat16))
+        yield
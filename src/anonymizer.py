@@ -6,13 +6,17 @@ Résolution des conflits PyTorch/Streamlit
 
 # === CONFIGURATION ANTI-CONFLIT ===
 import os
+import sys
 import warnings
 import logging
 import threading
 import uuid
+import secrets
 from datetime import datetime
 import json
 import shutil
+import importlib
+from importlib.util import find_spec
 
 # Configuration logging précoce
 logging.basicConfig(level=logging.WARNING)
@@ -22,15 +26,12 @@ for logger_name in ["transformers", "torch", "tensorflow", "urllib3"]:
 # Variables d'environnement critiques
 os.environ.update({
     "TOKENIZERS_PARALLELISM": "false",
-    "OMP_NUM_THREADS": "1",
-    "MKL_NUM_THREADS": "1",
-    "OPENBLAS_NUM_THREADS": "1",
-    "VECLIB_MAXIMUM_THREADS": "1",
-    "NUMEXPR_NUM_THREADS": "1",
     "KMP_DUPLICATE_LIB_OK": "TRUE",
     "PYTORCH_JIT": "0",
     "PYTORCH_JIT_USE_NNC": "0"
 })
+from . import _torch_setup
+_torch_setup.apply_thread_env()
 
 # Suppression warnings
 warnings.filterwarnings("ignore", category=UserWarning)
@@ -42,10 +43,9 @@ import re
 import unicodedata
 import tempfile
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple, Set
+from typing import List, Dict, Any, Callable, Optional, Tuple, Set, Union
 from typing import TYPE_CHECKING
-from dataclasses import dataclass, asdict
-from io import BytesIO
+from dataclasses import dataclass, fields
 import hashlib
 from .utils import (
     generate_anonymization_stats,
@@ -72,15 +72,17 @@ except ImportError:
     DOCX_SUPPORT = False
     logging.warning("Support DOCX désactivé: Module python-docx non disponible")
 
-try:
-    from pdf2docx import parse as pdf2docx_parse
-    PDF2DOCX_SUPPORT = True
-except ImportError:
-    PDF2DOCX_SUPPORT = False
+# Les dépendances lourdes (pdf2docx, pdfplumber, torch, transformers, spaCy)
+# ne sont que localisées ici via ``find_spec`` : leur import réel est différé
+# jusqu'à la première utilisation (voir ``__getattr__`` plus bas).
+PDF2DOCX_SUPPORT = find_spec("pdf2docx") is not None
+if not PDF2DOCX_SUPPORT:
     logging.warning("Support PDF2DOCX désactivé: Module pdf2docx non disponible")
 
 # === CONFIGURATION PYTORCH THREAD-SAFE ===
-_pytorch_lock = threading.Lock()
+# Réentrant : le chargement différé de transformers configure PyTorch alors
+# que le verrou est déjà tenu par l'initialisation du modèle.
+_pytorch_lock = threading.RLock()
 _pytorch_configured = False
 
 def configure_pytorch_safe():
@@ -97,9 +99,9 @@ def configure_pytorch_safe():
         try:
             import torch
             
-            # Configuration threads de base
+            # Configuration threads de base (une seule fois par processus)
             try:
-                torch.set_num_threads(1)
+                _torch_setup.once()
             except (RuntimeError, ValueError) as e:
                 # Misconfiguration of thread settings is non-fatal
                 logging.warning(f"Impossible de configurer num_threads: {e}")
@@ -134,51 +136,84 @@ def configure_pytorch_safe():
             logging.warning(f"Configuration PyTorch échouée: {e}")
             return False
 
-# Configurer PyTorch immédiatement
-PYTORCH_AVAILABLE = configure_pytorch_safe()
+# PyTorch est configuré au premier import de transformers, pas ici
+PYTORCH_AVAILABLE = find_spec("torch") is not None
 
 # === IMPORTS POUR TRAITEMENT DE DOCUMENTS ===
-try:
-    import pdfplumber
-    from pdf2docx import parse as pdf2docx_parse
-    from docx import Document
-    PDF_SUPPORT = True
+PDF_SUPPORT = DOCX_SUPPORT and PDF2DOCX_SUPPORT and find_spec("pdfplumber") is not None
+if PDF_SUPPORT:
     logging.info("Support PDF activé")
-except ImportError as e:
-    PDF_SUPPORT = False
-    logging.warning(f"Support PDF désactivé: {e}")
-
-# === IMPORTS IA SÉCURISÉS ===
-AI_SUPPORT = False
-SPACY_SUPPORT = False
-TRANSFORMERS_SUPPORT = False
+else:
+    logging.warning("Support PDF désactivé: pdfplumber, pdf2docx ou python-docx manquant")
 
+# === IMPORTS IA DIFFÉRÉS ===
 # Configuration SpaCy (plus stable avec Streamlit)
-try:
-    import spacy
-    SPACY_SUPPORT = True
+SPACY_SUPPORT = find_spec("spacy") is not None
+if SPACY_SUPPORT:
     logging.info("SpaCy disponible")
-except ImportError:
+else:
     logging.warning("SpaCy non disponible")
 
 # Configuration Transformers (avec protection anti-conflit)
-if PYTORCH_AVAILABLE:
+TRANSFORMERS_SUPPORT = PYTORCH_AVAILABLE and find_spec("transformers") is not None
+AI_SUPPORT = TRANSFORMERS_SUPPORT
+if not TRANSFORMERS_SUPPORT:
+    logging.warning("Transformers non disponible")
+
+
+def _load_transformers():
+    """Importer transformers après avoir configuré PyTorch"""
+    with _pytorch_lock:
+        configure_pytorch_safe()
+        transformers = importlib.import_module("transformers")
+        # Réduire les logs transformers
+        transformers.logging.set_verbosity_error()
+        logging.info("Transformers configuré avec succès")
+        return transformers
+
+
+def _load_french_stop_words():
+    """Mots vides français de SpaCy, ou liste minimale de repli"""
+    if SPACY_SUPPORT:
+        try:
+            return importlib.import_module("spacy.lang.fr.stop_words").STOP_WORDS
+        except Exception:  # pragma: no cover - installation SpaCy incomplète
+            pass
+    return {
+        "le", "la", "les", "de", "des", "du", "un", "une",
+        "et", "en", "dans", "que", "qui", "pour", "par"
+    }
+
+
+# Nom exposé -> fonction de chargement, résolu au premier accès (PEP 562)
+_LAZY_ATTRIBUTES = {
+    "torch": lambda: importlib.import_module("torch"),
+    "spacy": lambda: importlib.import_module("spacy"),
+    "pdfplumber": lambda: importlib.import_module("pdfplumber"),
+    "pdf2docx_parse": lambda: importlib.import_module("pdf2docx").parse,
+    "transformers": _load_transformers,
+    "pipeline": lambda: _load_transformers().pipeline,
+    "FRENCH_STOP_WORDS": _load_french_stop_words,
+}
+
+
+def __getattr__(name: str):
+    loader = _LAZY_ATTRIBUTES.get(name)
+    if loader is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = loader()
+    # Les accès suivants ne repassent plus par __getattr__
+    globals()[name] = value
+    return value
+
+
+def _lazy(name: str):
+    """Accès interne aux dépendances différées (les globales du module ne
+    passent pas par ``__getattr__``)."""
     try:
-        # Import sécurisé de transformers
-        with _pytorch_lock:
-            import transformers
-            from transformers import pipeline
-            
-            # Réduire les logs transformers
-            transformers.logging.set_verbosity_error()
-            
-            TRANSFORMERS_SUPPORT = True
-            AI_SUPPORT = True
-            logging.info("Transformers configuré avec succès")
-            
-    except (ImportError, OSError, RuntimeError) as e:
-        # Import or runtime issues while loading transformers
-        logging.warning(f"Transformers non disponible: {e}")
+        return globals()[name]
+    except KeyError:
+        return __getattr__(name)
 
 # === IMPORTS LOCAUX ===
 # Assuming these are in a config.py file
@@ -207,15 +242,20 @@ DEFAULT_REPLACEMENTS = {
 # Types d'entités disposant de validations fortes
 VALIDATED_ENTITY_TYPES = {"EMAIL", "PHONE", "IBAN", "SIRET", "SIREN", "SSN", "TVA"}
 
-# === FILTRES FRANÇAIS ===
-try:
-    from spacy.lang.fr.stop_words import STOP_WORDS as FRENCH_STOP_WORDS
-except Exception:  # pragma: no cover - fallback si SpaCy indisponible
-    FRENCH_STOP_WORDS = {
-        "le", "la", "les", "de", "des", "du", "un", "une",
-        "et", "en", "dans", "que", "qui", "pour", "par"
-    }
+# Types des patterns français -> types canoniques
+FRENCH_TYPE_NORMALIZATION = {
+    "PERSON_FR": "PERSON",
+    "ORG_FR": "ORG",
+    "SSN_FR": "SSN",
+    "SIRET_FR": "SIRET",
+    "SIREN_FR": "SIREN",
+    "TVA_FR": "TVA",
+    "ARTICLE_LOI": "LEGAL_REF",
+    "NUMERO_DOSSIER": "CASE_NUMBER",
+    "RG_NUMBER": "COURT_REF",
+}
 
+# === FILTRES FRANÇAIS ===
 FRENCH_TITLES = {
     "maître", "maitre", "m.", "mr", "mme", "mlle", "dr", "me",
     "docteur", "professeur"
@@ -235,6 +275,10 @@ DEFAULT_FILTER_CONFIG = {
     "require_title": False,
 }
 
+# Nombre de chunks soumis ensemble au pipeline NER : les pipelines
+# Transformers regroupent alors les entrées dans un même passage du modèle.
+NER_BATCH_SIZE = 32
+
 
 PERSON_TITLE_PATTERN = re.compile(
     r"^(?:m\.?|mme|mlle|mle|mr|dr|me|ma[iî]tre)\s+",
@@ -253,6 +297,29 @@ def normalize_person_name(name: str) -> str:
     return name
 
 
+def build_replacer(replacement_map: Dict[str, str]):
+    """Construire une fonction de remplacement à partir d'un mapping valeur -> jeton.
+
+    Toutes les valeurs sont fusionnées dans une seule expression (les plus
+    longues en premier) : chaque texte est parcouru une fois et chaque
+    occurrence est résolue par une simple recherche dans le dictionnaire.
+    """
+    lookup = {original: token for original, token in replacement_map.items() if original and token}
+    if not lookup:
+        return lambda text: text
+
+    pattern = re.compile(
+        "|".join(re.escape(original) for original in sorted(lookup, key=len, reverse=True))
+    )
+
+    def _replace(text: str) -> str:
+        if not text:
+            return text
+        return pattern.sub(lambda m: lookup[m.group(0)], text)
+
+    return _replace
+
+
 def get_preceding_token(text: str, start: int) -> str:
     """Récupérer le mot précédent une position donnée."""
     before = text[:start].rstrip()
@@ -286,6 +353,16 @@ FRENCH_ENTITY_PATTERNS = {
     "RG_NUMBER": r"\bRG\s*:?\s*\d{2}/\d{5}\b"  # Référence de greffe
 }
 
+# Préfiltres des patterns intégrés : si le texte ne contient pas le caractère
+# indispensable (recherche ``str`` en C), le parcours regex est évité.
+PATTERN_REQUIRED_TEXT = {"EMAIL": "@"}
+DIGIT_PATTERN_TYPES = frozenset({
+    "PHONE", "IBAN", "DATE", "SSN_FR", "SIRET_FR", "SIREN_FR", "TVA_FR",
+    "FRENCH_ADDRESS", "FRENCH_MOBILE", "FRENCH_LANDLINE",
+    "ARTICLE_LOI", "NUMERO_DOSSIER", "RG_NUMBER",
+})
+_DIGIT_RE = re.compile(r"\d")
+
 # === MODÈLES IA OPTIMISÉS ===
 AI_MODELS = {
     "french_spacy_lg": {
@@ -320,9 +397,17 @@ AI_MODELS = {
     }
 }
 
-@dataclass
+# ``slots=True`` n'existe qu'à partir de Python 3.10 ; les versions
+# antérieures (3.8+ reste supporté) gardent un ``__dict__`` par instance
+_DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_SLOTS)
 class Entity:
-    """Classe représentant une entité détectée avec informations enrichies"""
+    """Classe représentant une entité détectée avec informations enrichies
+
+    ``slots=True`` (Python 3.10+) supprime le ``__dict__`` par instance : la
+    détection regex peut produire des milliers d'entités par document.
+    """
     id: str
     type: str
     value: str
@@ -339,6 +424,22 @@ class Entity:
     variants: Optional[List[str]] = None
     all_positions: Optional[List[Tuple[int, int]]] = None
 
+    def to_dict(self) -> Dict[str, Any]:
+        """Représentation dictionnaire de l'entité.
+
+        Équivalent à ``dataclasses.asdict`` sans la copie profonde récursive :
+        seules les listes sont copiées, les autres champs étant immuables.
+        """
+        data = {name: getattr(self, name) for name in _ENTITY_FIELDS}
+        if self.variants is not None:
+            data["variants"] = list(self.variants)
+        if self.all_positions is not None:
+            data["all_positions"] = list(self.all_positions)
+        return data
+
+
+_ENTITY_FIELDS = tuple(f.name for f in fields(Entity))
+
 class RegexAnonymizer:
     """Anonymiseur Regex avancé avec patterns français optimisés"""
 
@@ -414,6 +515,7 @@ class RegexAnonymizer:
     def _compile_patterns(self) -> None:
         """Précompiler les motifs regex configurés."""
         compiled: Dict[str, re.Pattern] = {}
+        prefilters: Dict[str, Tuple[Optional[str], bool]] = {}
         flags = re.IGNORECASE | re.MULTILINE
         for entity_type, pattern in self.patterns.items():
             try:
@@ -422,7 +524,15 @@ class RegexAnonymizer:
                 logging.warning(
                     f"Pattern regex invalide pour {entity_type}: {e}"
                 )
+                continue
+            # Les préfiltres ne valent que pour les patterns intégrés inchangés
+            if FRENCH_ENTITY_PATTERNS.get(entity_type) == pattern:
+                prefilters[entity_type] = (
+                    PATTERN_REQUIRED_TEXT.get(entity_type),
+                    entity_type in DIGIT_PATTERN_TYPES,
+                )
         self.compiled_patterns = compiled
+        self._pattern_prefilters = prefilters
 
     def refresh_patterns(
         self,
@@ -499,25 +609,37 @@ class RegexAnonymizer:
         """Détection d'entités avec patterns regex optimisés"""
         raw_entities: List[Entity] = []
         entity_id = 0
+        has_digit = _DIGIT_RE.search(text) is not None
+        prefilters = getattr(self, "_pattern_prefilters", {})
 
         for entity_type, compiled_pattern in self.compiled_patterns.items():
+            required_text, needs_digit = prefilters.get(entity_type, (None, False))
+            if (needs_digit and not has_digit) or (
+                required_text is not None and required_text not in text
+            ):
+                continue
+
+            # Type normalisé et remplacement ne dépendent que du pattern
+            normalized_type = self._normalize_entity_type(entity_type)
+            replacement = self.replacements.get(normalized_type, f"[{normalized_type}]")
+
             for match in compiled_pattern.finditer(text):
-                # Normaliser le type d'entité
-                normalized_type = self._normalize_entity_type(entity_type)
+                matched = match.group()
 
                 # Validation de l'entité
-                if not self._is_valid_entity_match(match.group(), normalized_type):
+                if not self._is_valid_entity_match(matched, normalized_type):
                     continue
 
+                start, end = match.span()
                 entity = Entity(
                     id=f"regex_{entity_id}",
                     type=normalized_type,
-                    value=match.group().strip(),
-                    start=match.start(),
-                    end=match.end(),
+                    value=matched.strip(),
+                    start=start,
+                    end=end,
                     confidence=1.0,
-                    replacement=self.replacements.get(normalized_type, f"[{normalized_type}]"),
-                    context=self._extract_context(text, match.start(), match.end()),
+                    replacement=replacement,
+                    context=self._extract_context(text, start, end),
                     method="regex"
                 )
                 raw_entities.append(entity)
@@ -707,10 +829,18 @@ class RegexAnonymizer:
             entity.replacement = token
             replacements.append((entity.value, token))
 
-        # Deuxième passe : appliquer les remplacements directement sur les valeurs
+        # Deuxième passe : appliquer tous les remplacements en un seul balayage.
+        # Les valeurs les plus longues sont placées en tête de l'alternance pour
+        # rester prioritaires, comme avec les substitutions successives.
+        token_by_value: Dict[str, str] = {}
         for original, token in sorted(set(replacements), key=lambda x: len(x[0]), reverse=True):
-            pattern = r"\b" + re.escape(original) + r"\b"
-            text = re.sub(pattern, token, text)
+            if original:
+                token_by_value.setdefault(original, token)
+        if token_by_value:
+            pattern = re.compile(
+                r"\b(?:" + "|".join(map(re.escape, token_by_value)) + r")\b"
+            )
+            text = pattern.sub(lambda m: token_by_value[m.group(0)], text)
 
         return text, self.entity_mapping
 
@@ -815,18 +945,7 @@ class RegexAnonymizer:
     
     def _normalize_entity_type(self, entity_type: str) -> str:
         """Normaliser les types d'entités français"""
-        mapping = {
-            "PERSON_FR": "PERSON",
-            "ORG_FR": "ORG", 
-            "SSN_FR": "SSN",
-            "SIRET_FR": "SIRET",
-            "SIREN_FR": "SIREN",
-            "TVA_FR": "TVA",
-            "ARTICLE_LOI": "LEGAL_REF",
-            "NUMERO_DOSSIER": "CASE_NUMBER",
-            "RG_NUMBER": "COURT_REF"
-        }
-        return mapping.get(entity_type, entity_type)
+        return FRENCH_TYPE_NORMALIZATION.get(entity_type, entity_type)
     
     def _is_valid_entity_match(self, value: str, entity_type: str) -> bool:
         """Valider qu'une entité détectée est pertinente"""
@@ -1408,10 +1527,13 @@ class AIAnonymizer:
     ):
         self.model_config = model_config or self._get_best_model(prefer_french)
         self.nlp_pipeline = None
-        self.spacy_nlp = None
+        self._spacy_nlp = None
+        self._spacy_model_name: Optional[str] = None
         self.regex_anonymizer = RegexAnonymizer(use_french_patterns=True)
         self.prefer_french = prefer_french
+        # Vrai seulement une fois le modèle effectivement chargé
         self.model_loaded = False
+        self.model_error: Optional[str] = None
 
         # Configuration des filtres
         self.filter_config = DEFAULT_FILTER_CONFIG.copy()
@@ -1420,6 +1542,32 @@ class AIAnonymizer:
 
         # Initialiser le modèle en mode thread-safe
         self._initialize_model_safe()
+
+    @property
+    def spacy_nlp(self):
+        """Pipeline SpaCy chargé à la première utilisation."""
+        if self._spacy_nlp is None and self._spacy_model_name:
+            with _pytorch_lock:
+                if self._spacy_nlp is None and self._spacy_model_name:
+                    try:
+                        self._spacy_nlp = _lazy("spacy").load(self._spacy_model_name)
+                        self.model_loaded = True
+                        logging.info(f"Modèle SpaCy chargé: {self._spacy_model_name}")
+                    except (ImportError, OSError, RuntimeError, ValueError) as e:
+                        logging.error(f"Échec du chargement SpaCy: {e}")
+                        self.model_loaded = False
+                        self.model_error = f"Échec du chargement SpaCy: {e}"
+                        self._spacy_model_name = None
+        return self._spacy_nlp
+
+    @spacy_nlp.setter
+    def spacy_nlp(self, value) -> None:
+        self._spacy_nlp = value
+
+    @property
+    def model_available(self) -> bool:
+        """Modèle chargé, ou modèle SpaCy sélectionné et pas encore chargé"""
+        return self.model_loaded or bool(self._spacy_model_name)
     
     def _get_best_model(self, prefer_french: bool) -> dict:
         """Sélectionner le meilleur modèle disponible selon les préférences"""
@@ -1438,46 +1586,50 @@ class AIAnonymizer:
         with _pytorch_lock:
             try:
                 if self.model_config["type"] == "spacy":
+                    # Sélection seulement : ``model_loaded`` passe à vrai
+                    # au premier chargement réussi de ``spacy_nlp``
                     self._initialize_spacy()
                 else:
                     self._initialize_transformers()
-                self.model_loaded = True
+                    self.model_loaded = True
                 
             except (OSError, RuntimeError, ValueError) as e:
                 # Model loading issues disable AI features but allow regex mode
                 logging.error(f"Échec du chargement du modèle IA: {e}")
                 logging.info("Fallback vers mode regex uniquement")
+                self.model_error = f"Échec du chargement du modèle IA: {e}"
     
     def _initialize_spacy(self):
         """Initialiser SpaCy (recommandé pour le français)"""
         if not SPACY_SUPPORT:
             raise Exception("SpaCy non disponible")
         
+        # Le modèle n'est que localisé ici ; le chargement (plusieurs centaines
+        # de Mo) est différé jusqu'au premier accès à ``spacy_nlp``.
+        name = self.model_config["name"]
         try:
-            self.spacy_nlp = spacy.load(self.model_config["name"])
-            logging.info(f"Modèle SpaCy chargé: {self.model_config['name']}")
-            
-        except OSError:
+            spacy = _lazy("spacy")
+        except ImportError as e:
+            raise RuntimeError(f"SpaCy non disponible: {e}") from e
+        if spacy.util.is_package(name):
+            self._spacy_model_name = name
+        elif name == "fr_core_news_lg" and spacy.util.is_package("fr_core_news_sm"):
             # Essayer le modèle compact si le large n'est pas disponible
-            if self.model_config["name"] == "fr_core_news_lg":
-                try:
-                    self.spacy_nlp = spacy.load("fr_core_news_sm")
-                    logging.info("Modèle SpaCy compact chargé: fr_core_news_sm")
-                    return
-                except OSError:
-                    pass
-            
-            raise Exception(f"Modèle SpaCy non trouvé: {self.model_config['name']}")
-        
-        except (RuntimeError, ValueError) as e:
-            # Other SpaCy runtime issues
-            raise Exception(f"Erreur SpaCy: {e}")
+            self._spacy_model_name = "fr_core_news_sm"
+        else:
+            raise Exception(f"Modèle SpaCy non trouvé: {name}")
+        logging.info(f"Modèle SpaCy sélectionné (chargement différé): {self._spacy_model_name}")
     
     def _initialize_transformers(self):
         """Initialiser Transformers avec protection anti-conflit"""
         if not TRANSFORMERS_SUPPORT:
             raise Exception("Transformers non disponible")
         
+        try:
+            pipeline = _lazy("pipeline")
+        except ImportError as e:
+            raise RuntimeError(f"Transformers non disponible: {e}") from e
+
         try:
             # Configuration pipeline avec protection thread
             self.nlp_pipeline = pipeline(
@@ -1509,17 +1661,20 @@ class AIAnonymizer:
         text: str,
         confidence_threshold: float = 0.7,
         final_threshold: float = 0.0,
+        batch_size: int = NER_BATCH_SIZE,
     ) -> List[Entity]:
         """Détection d'entités avec IA + fusion regex"""
         ai_entities: List[Entity] = []
 
-        # Étape 1: Détection IA
-        if self.model_loaded:
+        # Étape 1: Détection IA (le modèle SpaCy se charge au premier appel)
+        if self.model_available:
             try:
-                if self.spacy_nlp:
+                if self._spacy_model_name or self._spacy_nlp:
                     ai_entities = self._detect_with_spacy(text, confidence_threshold)
                 elif self.nlp_pipeline:
-                    ai_entities = self._detect_with_transformers(text, confidence_threshold)
+                    ai_entities = self._detect_with_transformers(
+                        text, confidence_threshold, batch_size=batch_size
+                    )
                 logging.info(f"IA: {len(ai_entities)} entités détectées")
             except (RuntimeError, ValueError) as e:
                 logging.error(f"Erreur détection IA: {e}")
@@ -1528,13 +1683,13 @@ class AIAnonymizer:
         regex_entities = self.regex_anonymizer.detect_entities(
             text, compute_conf=False
         )
-        self._compute_agreement_scores(regex_entities, ai_entities)
+        agreement = self._compute_agreement_scores(regex_entities, ai_entities)
         merged_regex = self._merge_regex_entities(ai_entities, regex_entities)
         entities = ai_entities + merged_regex
 
         # Étape 3: Post-traitement final
         entities = self._post_process_entities(entities, text)
-        self._apply_final_confidence(entities)
+        self._apply_final_confidence(entities, agreement)
         entities = [e for e in entities if e.confidence >= final_threshold]
 
         logging.info(f"Total final: {len(entities)} entités")
@@ -1543,7 +1698,12 @@ class AIAnonymizer:
     def _detect_with_spacy(self, text: str, confidence_threshold: float) -> List[Entity]:
         """Détection avec SpaCy optimisée"""
         entities = []
-        
+
+        # Pas de seuil de longueur : les regex ne couvrent pas les personnes,
+        # organisations et lieux, même dans un texte court
+        if self.spacy_nlp is None:
+            return entities
+
         try:
             # Traitement par chunks pour les gros documents
             chunks = self._chunk_text(text, max_length=1000000)  # 1M chars max par chunk
@@ -1559,7 +1719,7 @@ class AIAnonymizer:
                         entity_type = self._map_spacy_label(ent.label_)
                         
                         entity = Entity(
-                            id=f"spacy_{uuid.uuid4().hex[:8]}",
+                            id=f"spacy_{secrets.token_hex(4)}",
                             type=entity_type,
                             value=ent.text.strip(),
                             start=chunk_start + ent.start_char,
@@ -1578,26 +1738,42 @@ class AIAnonymizer:
             logging.error(f"Erreur SpaCy: {e}")
             return []
     
-    def _detect_with_transformers(self, text: str, confidence_threshold: float) -> List[Entity]:
-        """Détection avec Transformers en mode sécurisé"""
+    def _detect_with_transformers(
+        self,
+        text: str,
+        confidence_threshold: float,
+        batch_size: int = NER_BATCH_SIZE,
+    ) -> List[Entity]:
+        """Détection avec Transformers en mode sécurisé
+
+        Les chunks sont soumis en lots de ``batch_size`` ; en cas d'échec du
+        lot, ils sont repris un par un pour isoler le chunk fautif.
+        """
         entities = []
         
         try:
-            # Protection thread pour Transformers
-            with _pytorch_lock:
+            # Protection thread pour Transformers, inférence sans autograd
+            with _pytorch_lock, _torch_setup.inference_context():
                 chunks = self._chunk_text(text, max_length=512)
+                chunk_texts = [chunk_text for _, chunk_text in chunks]
+                try:
+                    batch_results = self.nlp_pipeline(chunk_texts, batch_size=batch_size)
+                except (RuntimeError, ValueError) as e:
+                    logging.warning(f"Erreur sur le lot NER, reprise chunk par chunk: {e}")
+                    batch_results = [None] * len(chunks)
                 
-                for chunk_start, chunk_text in chunks:
+                for (chunk_start, chunk_text), ner_results in zip(chunks, batch_results):
                     try:
                         # Pipeline NER avec gestion d'erreurs
-                        ner_results = self.nlp_pipeline(chunk_text)
+                        if ner_results is None:
+                            ner_results = self.nlp_pipeline(chunk_text)
                         
                         for result in ner_results:
                             if result['score'] >= confidence_threshold:
                                 entity_type = self._map_ner_label(result['entity_group'])
                                 
                                 entity = Entity(
-                                    id=f"transformers_{uuid.uuid4().hex[:8]}",
+                                    id=f"transformers_{secrets.token_hex(4)}",
                                     type=entity_type,
                                     value=result['word'].strip(),
                                     start=chunk_start + result['start'],
@@ -1633,8 +1809,14 @@ class AIAnonymizer:
             
             # Essayer de couper à une limite de phrase ou de paragraphe
             if end < len(text):
-                # Chercher un point suivi d'espace et majuscule
-                sentence_end = text.rfind('. ', start, end)
+                # Chercher la dernière fin de phrase ou de ligne (recherches
+                # ``rfind`` effectuées en C plutôt qu'une boucle caractère par caractère)
+                sentence_end = max(
+                    text.rfind('. ', start, end),
+                    text.rfind('! ', start, end),
+                    text.rfind('? ', start, end),
+                    text.rfind('\n', start, end),
+                )
                 if sentence_end > start + max_length // 2:
                     end = sentence_end + 1
                 else:
@@ -1746,25 +1928,31 @@ class AIAnonymizer:
 
     def _compute_agreement_scores(
         self, regex_entities: List[Entity], ai_entities: List[Entity]
-    ) -> None:
-        """Marquer les entités en accord entre regex et IA."""
-        for ent in regex_entities + ai_entities:
-            setattr(ent, "_agreement", 0.0)
+    ) -> Dict[int, float]:
+        """Marquer les entités en accord entre regex et IA.
 
+        Les scores sont indexés par ``id()`` de l'entité, ``Entity`` n'ayant
+        pas de ``__dict__`` pour porter un attribut ad hoc.
+        """
+        agreement: Dict[int, float] = {}
         for r in regex_entities:
             for a in ai_entities:
                 if self._calculate_overlap(r, a) >= 0.5:
-                    r._agreement = 1.0
-                    a._agreement = 1.0
+                    agreement[id(r)] = 1.0
+                    agreement[id(a)] = 1.0
+        return agreement
 
-    def _apply_final_confidence(self, entities: List[Entity]) -> None:
+    def _apply_final_confidence(
+        self, entities: List[Entity], agreement: Optional[Dict[int, float]] = None
+    ) -> None:
         """Calculer la confiance finale pour chaque entité."""
+        agreement = agreement or {}
         for ent in entities:
             method_score = 1.0 if ent.method == "regex" else ent.confidence
             validation_score = (
                 1.0 if ent.type in VALIDATED_ENTITY_TYPES else 0.5
             )
-            agreement_score = getattr(ent, "_agreement", 0.0)
+            agreement_score = agreement.get(id(ent), 0.0)
             ent.confidence = compute_confidence(
                 method_score, validation_score, agreement_score
             )
@@ -1821,7 +2009,7 @@ class AIAnonymizer:
                     continue
 
             if cfg.get("stopwords", True) and entity.type == "PERSON":
-                if entity.value.lower() in FRENCH_STOP_WORDS:
+                if entity.value.lower() in _lazy("FRENCH_STOP_WORDS"):
                     continue
 
             if cfg.get("capitalization", True) and entity.type == "PERSON":
@@ -1987,7 +2175,7 @@ class DocumentProcessor:
         
         # Méthode 1: pdfplumber (recommandée)
         try:
-            with pdfplumber.open(file_path) as pdf:
+            with _lazy("pdfplumber").open(file_path) as pdf:
                 metadata["pages"] = len(pdf.pages)
                 metadata["extraction_method"] = "pdfplumber"
                 
@@ -2016,7 +2204,7 @@ class DocumentProcessor:
                 metadata["text_length"] = len(text_content)
                 return text_content, metadata
         
-        except (OSError, RuntimeError) as e:
+        except (ImportError, OSError, RuntimeError) as e:
             logging.warning(f"pdfplumber échoué: {e}")
         
         # Méthode 2: PyMuPDF fallback
@@ -2048,7 +2236,7 @@ class DocumentProcessor:
             with tempfile.NamedTemporaryFile(delete=False, suffix=".docx") as tmp_docx:
                 temp_docx = tmp_docx.name
 
-            pdf2docx_parse(file_path, temp_docx)
+            _lazy("pdf2docx_parse")(file_path, temp_docx)
 
             text_content, docx_metadata = self.extract_text_from_docx(temp_docx)
             metadata.update(docx_metadata)
@@ -2217,6 +2405,25 @@ class DocumentAnonymizer:
             "ai_available": self.ai_anonymizer is not None
         }
 
+    @staticmethod
+    def probe_ner_status() -> Tuple[str, bool]:
+        """Backend NER qu'utiliserait l'anonymiseur, sans charger de modèle.
+
+        Seule la présence des paquets est vérifiée (``find_spec``) : SpaCy et
+        Transformers ne sont pas importés. Retourne ``(backend, disponible)``
+        avec ``backend`` parmi ``"spacy"``, ``"transformers"`` et ``"regex"``.
+        """
+        if SPACY_SUPPORT:
+            # Même ordre de préférence que ``_initialize_spacy``
+            model_found = any(
+                find_spec(name) is not None
+                for name in (AI_MODELS["french_spacy_lg"]["name"], "fr_core_news_sm")
+            )
+            return "spacy", model_found
+        if TRANSFORMERS_SUPPORT:
+            return "transformers", True
+        return "regex", False
+
     def _validate_anonymization(
         self,
         original_text: str,
@@ -2235,11 +2442,22 @@ class DocumentAnonymizer:
         confidence: float = 0.7,
         audit: bool = False,
         filter_config: Optional[Dict[str, bool]] = None,
+        progress_callback: Optional[Callable[[int, str], None]] = None,
+        batch_size: int = NER_BATCH_SIZE,
     ) -> Dict[str, Any]:
-        """Traitement principal avec option de rapport d'audit"""
+        """Traitement principal avec option de rapport d'audit
+
+        ``progress_callback(pourcentage, message)`` est appelé à la fin de
+        chaque phase réelle (lecture, préparation, analyse, finalisation).
+        ``batch_size`` fixe le nombre de chunks par appel au pipeline NER.
+        """
         import time
         start_time = time.time()
 
+        def report(percent: int, message: str) -> None:
+            if progress_callback is not None:
+                progress_callback(percent, message)
+
         original_config = self.filter_config.copy()
         if filter_config:
             self.filter_config.update(filter_config)
@@ -2262,6 +2480,7 @@ class DocumentAnonymizer:
             # Extraction du texte
             logging.info(f"Traitement du document: {file_path}")
             text, metadata = self.document_processor.process_file(file_path)
+            report(25, "📖 Lecture du document")
             
             if not text.strip():
                 return {
@@ -2272,18 +2491,28 @@ class DocumentAnonymizer:
             # Prétraitement du texte
             text = self._preprocess_text(text)
             logging.info(f"Texte extrait: {len(text)} caractères")
+            report(35, "🧹 Préparation du texte")
             
             # Détection des entités selon le mode
             if mode == "ai" and self.ai_anonymizer:
                 logging.info("Détection IA en cours...")
-                entities = self.ai_anonymizer.detect_entities_ai(text, confidence)
-                metadata["detection_method"] = "ai"
+                entities = self.ai_anonymizer.detect_entities_ai(
+                    text, confidence, batch_size=batch_size
+                )
+                # Méthode réelle : un modèle qui n'a pas pu être chargé laisse
+                # la détection aux seules regex
+                if self.ai_anonymizer.model_loaded:
+                    metadata["detection_method"] = "ai"
+                else:
+                    metadata["detection_method"] = "regex"
+                    metadata["ai_error"] = self.ai_anonymizer.model_error or "Modèle NER non chargé"
             else:
                 logging.info("Détection regex en cours...")
                 entities = self.regex_anonymizer.detect_entities(text)
                 metadata["detection_method"] = "regex"
             
             logging.info(f"Entités détectées: {len(entities)}")
+            report(70, f"🔍 Analyse {mode.upper()}")
             
             # Post-traitement et validation
             entities = self._post_process_entities(entities, text)
@@ -2321,9 +2550,11 @@ class DocumentAnonymizer:
                 audit=audit,
             )
 
+            report(90, "⚡ Finalisation")
+
             return {
                 "status": "success",
-                "entities": [asdict(entity) for entity in entities],
+                "entities": [entity.to_dict() for entity in entities],
                 "text": text,
                 "anonymized_text": anonymized_text,
                 "anonymized_path": anonymized_path,
@@ -2466,11 +2697,8 @@ class DocumentAnonymizer:
                     )
                 else:
                     raise ValueError("Invalid entity format")
-            entities = [asdict(e) for e in entity_objects]
         else:
-            detected = self.regex_anonymizer.detect_entities(text)
-            entity_objects = detected
-            entities = [asdict(e) for e in detected]
+            entity_objects = self.regex_anonymizer.detect_entities(text)
 
         anonymized_text, mapping = self.regex_anonymizer.anonymize_text(
             text, entity_objects
@@ -2483,14 +2711,20 @@ class DocumentAnonymizer:
             if serialized is not None:
                 metadata["entity_mapping"] = serialized
 
-        stats = generate_anonymization_stats(entities, len(text)) if audit else None
+        # Les dictionnaires ne servent qu'aux statistiques d'audit : le
+        # remplacement DOCX lit directement les objets Entity.
+        stats = None
+        if audit:
+            stats = generate_anonymization_stats(
+                [e.to_dict() for e in entity_objects], len(text)
+            )
 
         return self._write_export(
             anonymized_text,
             output_format,
             options,
             stats,
-            entities,
+            entity_objects,
             metadata,
             audit=audit,
             original_path=original_path,
@@ -2534,7 +2768,7 @@ class DocumentAnonymizer:
         if audit:
             try:
                 stats = generate_anonymization_stats(
-                    [asdict(e) if isinstance(e, Entity) else e for e in entities],
+                    [e.to_dict() if isinstance(e, Entity) else e for e in entities],
                     len(anonymized_text),
                 )
             except Exception:
@@ -2566,24 +2800,8 @@ class DocumentAnonymizer:
                         if getattr(ent, "replacement", None):
                             replacement_map[ent.value] = ent.replacement
 
-                ordered_replacements: List[Tuple[str, str]] = [
-                    (original, token)
-                    for original, token in sorted(
-                        replacement_map.items(),
-                        key=lambda item: len(item[0]),
-                        reverse=True,
-                    )
-                    if original and token
-                ]
-
                 # Utilitaire de remplacement simple
-                def _replace_text(text: str) -> str:
-                    if not text:
-                        return text
-                    for original, token in ordered_replacements:
-                        if original in text:
-                            text = text.replace(original, token)
-                    return text
+                _replace_text = build_replacer(replacement_map)
 
                 def _replace_in_paragraph(paragraph):
                     for run in paragraph.runs:
@@ -2767,7 +2985,7 @@ class DocumentAnonymizer:
         output_format: str,
         options: Dict[str, Any],
         stats: Optional[Dict[str, Any]] = None,
-        entities: Optional[List[Dict]] = None,
+        entities: Optional[List[Union[Entity, Dict]]] = None,
         metadata: Optional[Dict[str, Any]] = None,
         audit: bool = False,
         original_path: Optional[str] = None,
@@ -2846,23 +3064,7 @@ class DocumentAnonymizer:
                     if value and replacement:
                         replacement_map[value] = replacement
 
-            ordered_replacements: List[Tuple[str, str]] = [
-                (original, token)
-                for original, token in sorted(
-                    replacement_map.items(),
-                    key=lambda item: len(item[0]),
-                    reverse=True,
-                )
-                if original and token
-            ]
-
-            def _apply_replacements(text: str) -> str:
-                if not ordered_replacements or not text:
-                    return text
-                for original, token in ordered_replacements:
-                    if original in text:
-                        text = text.replace(original, token)
-                return text
+            _apply_replacements = build_replacer(replacement_map)
 
             def _replace_in_runs(runs):
                 for run in runs:
@@ -3031,7 +3233,7 @@ class DocumentAnonymizer:
                     continue
 
             if cfg.get("stopwords", True) and entity.type == "PERSON":
-                if entity.value.lower() in FRENCH_STOP_WORDS:
+                if entity.value.lower() in _lazy("FRENCH_STOP_WORDS"):
                     continue
 
             if cfg.get("capitalization", True) and entity.type == "PERSON":
@@ -1,7 +1,6 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import asdict
 from typing import Any, Dict, List, Optional, Tuple
 
 from .anonymizer import RegexAnonymizer, AIAnonymizer, DocumentProcessor, Entity
@@ -86,7 +85,7 @@ class EnhancedDocumentAnonymizer:
             elif e.type in {"FRENCH_COMPANY", "ORG_FR"}:
                 e.type = "ORG"
 
-        if self.ai_anonymizer and getattr(self.ai_anonymizer, "model_loaded", False):
+        if self.ai_anonymizer and getattr(self.ai_anonymizer, "model_available", False):
             try:
                 ai_entities = self.ai_anonymizer.detect_entities_ai(text)
             except Exception:  # pragma: no cover - failure is non fatal
@@ -103,7 +102,7 @@ class EnhancedDocumentAnonymizer:
         """Return a serialisable representation of ``entities`` with canonical forms."""
         serialised: List[Dict[str, Any]] = []
         for ent in entities:
-            data = asdict(ent)
+            data = ent.to_dict()
             if ent.type == "PERSON":
                 data["canonical"] = self.normalizer.normalize_person_name(ent.value).canonical
             else:
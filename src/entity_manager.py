@@ -1,10 +1,20 @@
-import uuid
+import heapq
 import json
+import secrets
 import logging
 import re
-from typing import List, Dict, Any, Optional, Iterable
+from collections import Counter
+from typing import List, Dict, Any, Optional, Iterable, Tuple
 from datetime import datetime
 
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - fallback sur le module json standard
+    orjson = None  # type: ignore
+
+# Champs obligatoires de toute entité gérée
+REQUIRED_ENTITY_FIELDS = ('type', 'value', 'start', 'end')
+
 class EntityManager:
     """Gestionnaire pour les entités et groupes d'entités"""
     
@@ -15,25 +25,30 @@ class EntityManager:
         self.max_history = 50
         # Cache for grouped entities to avoid recomputation
         self._grouped_entities_cache: Optional[Dict[str, Dict[str, Any]]] = None
+        # Index id -> position dans ``entities``, vérifié à chaque lecture
+        self._entity_index: Optional[Dict[str, int]] = None
+        self._entity_index_source: Optional[List[Dict[str, Any]]] = None
+        self._entity_index_size = 0
 
     def _invalidate_grouped_entities_cache(self) -> None:
         """Invalidate cached grouped entities."""
         self._grouped_entities_cache = None
+        # Les mêmes mutations peuvent modifier les identifiants
+        self._entity_index = None
     
     def add_entity(self, entity_data: Dict[str, Any]) -> str:
         """Ajouter une nouvelle entité"""
         try:
             # Générer un ID unique si pas fourni
             if 'id' not in entity_data:
-                entity_data['id'] = str(uuid.uuid4())
+                entity_data['id'] = secrets.token_hex(16)
             
             # Ajouter timestamp
             entity_data['created_at'] = datetime.now().isoformat()
             entity_data['updated_at'] = entity_data['created_at']
             
             # Valider les champs requis
-            required_fields = ['type', 'value', 'start', 'end']
-            for field in required_fields:
+            for field in REQUIRED_ENTITY_FIELDS:
                 if field not in entity_data:
                     raise ValueError(f"Champ requis manquant: {field}")
             
@@ -53,6 +68,38 @@ class EntityManager:
             logging.error(f"Error adding entity: {str(e)}")
             raise
     
+    @classmethod
+    def bulk_load(cls, entities: Iterable[Dict[str, Any]]) -> "EntityManager":
+        """Créer un gestionnaire à partir d'entités déjà détectées
+
+        Équivaut à une suite d'``add_entity`` sans historique ni invalidation
+        de cache par entité. Les doublons (même type, même position) ne sont
+        conservés qu'une fois.
+        """
+        manager = cls()
+        timestamp = datetime.now().isoformat()
+        seen = set()
+        loaded = []
+        for entity_data in entities:
+            for field in REQUIRED_ENTITY_FIELDS:
+                if field not in entity_data:
+                    raise ValueError(f"Champ requis manquant: {field}")
+
+            key = (entity_data['start'], entity_data['end'], entity_data['type'])
+            if key in seen:
+                continue
+            seen.add(key)
+
+            if 'id' not in entity_data:
+                entity_data['id'] = secrets.token_hex(16)
+            entity_data['created_at'] = timestamp
+            entity_data['updated_at'] = timestamp
+            loaded.append(entity_data)
+
+        manager.entities = loaded
+        logging.info(f"{len(loaded)} entities loaded")
+        return manager
+
     def update_entity(self, entity_id: str, updates: Dict[str, Any]) -> bool:
         """Mettre à jour une entité existante"""
         try:
@@ -255,11 +302,42 @@ class EntityManager:
         return grouped
     
     def get_entity_by_id(self, entity_id: str) -> Optional[Dict[str, Any]]:
-        """Récupérer une entité par son ID"""
-        for entity in self.entities:
-            if entity['id'] == entity_id:
-                return entity
-        return None
+        """Récupérer une entité par son ID
+
+        L'index associe chaque ID à sa position dans ``entities``. Il garde une
+        référence vers la liste indexée (son ``id()`` ne peut donc pas être
+        réutilisé par une autre liste) et chaque résultat est relu dans la
+        liste courante : une liste remplacée, redimensionnée ou modifiée en
+        place provoque la reconstruction de l'index.
+        """
+        if (
+            self._entity_index is None
+            or self._entity_index_source is not self.entities
+            or self._entity_index_size != len(self.entities)
+        ):
+            self._rebuild_entity_index()
+
+        position = self._entity_index.get(entity_id)
+        if position is None:
+            return None
+        entity = self.entities[position]
+        if entity.get('id') != entity_id:
+            # Élément remplacé en place : l'index est reconstruit
+            self._rebuild_entity_index()
+            position = self._entity_index.get(entity_id)
+            if position is None:
+                return None
+            entity = self.entities[position]
+        return entity
+
+    def _rebuild_entity_index(self) -> None:
+        """Reconstruire l'index id -> position sur la liste courante"""
+        index: Dict[str, int] = {}
+        for position, entity in enumerate(self.entities):
+            index.setdefault(entity.get('id'), position)
+        self._entity_index = index
+        self._entity_index_source = self.entities
+        self._entity_index_size = len(self.entities)
     
     def get_entities_by_type(self, entity_type: str) -> List[Dict[str, Any]]:
         """Récupérer toutes les entités d'un type donné"""
@@ -294,7 +372,8 @@ class EntityManager:
         
         # Filtre par type
         if 'types' in filters and filters['types']:
-            filtered = [e for e in filtered if e.get('type') in filters['types']]
+            allowed_types = set(filters['types'])
+            filtered = [e for e in filtered if e.get('type') in allowed_types]
         
         # Filtre par confiance
         if 'min_confidence' in filters:
@@ -353,7 +432,8 @@ class EntityManager:
             # Nettoyer le nom pour générer un identifiant lisible
             slug = re.sub(r"[^A-Za-z0-9]+", "_", name.strip()).strip("_")
             if not slug:
-                slug = f"GROUP_{uuid.uuid4().hex[:8]}"
+                # Numéro séquentiel ; l'unicité est assurée juste après
+                slug = f"GROUP_{len(self.groups) + 1}"
             base_id = slug.upper()
 
             existing_ids = {group.get("id") for group in self.groups}
@@ -565,11 +645,20 @@ class EntityManager:
 
         for entity in to_delete:
             self._save_to_history("delete_entity", entity["id"], entity.copy())
-            self._remove_entity_from_all_groups(entity["id"])
-            logging.info(f"Entity deleted: {entity['id']}")
+
+        # Retirer toutes les entités des groupes en un seul passage
+        deleted_ids = {entity["id"] for entity in to_delete}
+        now = datetime.now().isoformat()
+        for group in self.groups:
+            entity_ids = group.get("entity_ids", [])
+            kept = [eid for eid in entity_ids if eid not in deleted_ids]
+            if len(kept) != len(entity_ids):
+                group["entity_ids"] = kept
+                group["updated_at"] = now
 
         # Remove entities from list
         self.entities = [e for e in self.entities if e.get("replacement") != token]
+        logging.info(f"Entities deleted: {len(to_delete)}")
 
         # Invalidate grouped cache since entities changed
         self._invalidate_grouped_entities_cache()
@@ -642,24 +731,31 @@ class EntityManager:
         if not group:
             return []
         
+        # Ensemble construit une fois : appartenance en O(1) par entité
+        group_entity_ids = set(group['entity_ids'])
         return [
             entity for entity in self.entities 
-            if entity['id'] in group['entity_ids']
+            if entity['id'] in group_entity_ids
         ]
     
     def _remove_entity_from_all_groups(self, entity_id: str):
         """Retirer une entité de tous les groupes"""
+        now = None
         for group in self.groups:
-            if entity_id in group['entity_ids']:
-                group['entity_ids'].remove(entity_id)
-                group['updated_at'] = datetime.now().isoformat()
+            ids = group['entity_ids']
+            if entity_id in ids:
+                # Filtrage en une passe, en conservant la même liste
+                ids[:] = [eid for eid in ids if eid != entity_id]
+                if now is None:
+                    now = datetime.now().isoformat()
+                group['updated_at'] = now
     
     # Historique et undo/redo
     
     def _save_to_history(self, action: str, target_id: str, old_data: Dict = None):
         """Sauvegarder une action dans l'historique"""
         history_entry = {
-            'id': str(uuid.uuid4()),
+            'id': secrets.token_hex(16),
             'action': action,
             'target_id': target_id,
             'old_data': old_data,
@@ -805,8 +901,18 @@ class EntityManager:
         """Exporter vers un fichier JSON"""
         try:
             data = self.export_to_dict()
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+            if orjson is not None:
+                # Sérialisation en C, écrite directement en UTF-8
+                payload = orjson.dumps(
+                    data,
+                    default=str,
+                    option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS,
+                )
+                with open(file_path, 'wb') as f:
+                    f.write(payload)
+            else:
+                with open(file_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, indent=2, default=str)
             
             logging.info(f"Data exported to {file_path}")
             return True
@@ -819,8 +925,12 @@ class EntityManager:
     def import_from_json(self, file_path: str, merge: bool = False) -> bool:
         """Importer depuis un fichier JSON"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if orjson is not None:
+                with open(file_path, 'rb') as f:
+                    data = orjson.loads(f.read())
+            else:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
             
             self.import_from_dict(data, merge)
             logging.info(f"Data imported from {file_path}")
@@ -835,15 +945,11 @@ class EntityManager:
     
     def get_statistics(self, thresholds: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
         """Récupérer des statistiques sur les entités et groupes"""
-        entity_types = {}
-        confidence_values = []
-        
-        for entity in self.entities:
-            entity_type = entity.get('type', 'UNKNOWN')
-            entity_types[entity_type] = entity_types.get(entity_type, 0) + 1
-            
-            if 'confidence' in entity:
-                confidence_values.append(entity['confidence'])
+        type_counts = Counter(entity.get('type', 'UNKNOWN') for entity in self.entities)
+        entity_types = dict(type_counts)
+        confidence_values = [
+            entity['confidence'] for entity in self.entities if 'confidence' in entity
+        ]
         
         # Statistiques de confiance
         confidence_stats = {}
@@ -878,7 +984,7 @@ class EntityManager:
             'entity_types': entity_types,
             'confidence_stats': confidence_stats,
             'group_stats': group_stats,
-            'most_common_type': max(entity_types, key=entity_types.get) if entity_types else None,
+            'most_common_type': type_counts.most_common(1)[0][0] if type_counts else None,
             'history_size': len(self.history)
         }
     
@@ -957,27 +1063,37 @@ class EntityManager:
         conflicts: List[Dict[str, Any]] = []
 
         # --- Conflits de chevauchement ---
+        # Balayage : entités triées par début, tas des entités encore
+        # « ouvertes » indexé par leur fin. Seules les paires qui se
+        # chevauchent réellement sont examinées.
         sorted_entities = sorted(self.entities, key=lambda x: x.get('start', 0))
-
-        for i, entity1 in enumerate(sorted_entities):
-            for entity2 in sorted_entities[i + 1:]:
-                start1, end1 = entity1.get('start', 0), entity1.get('end', 0)
-                start2, end2 = entity2.get('start', 0), entity2.get('end', 0)
-
-                if start2 >= end1:
-                    break  # Plus de chevauchement possible
-
-                if start1 < end2 and start2 < end1:
-                    conflicts.append(
-                        {
-                            'type': 'overlap',
-                            'entity1': entity1,
-                            'entity2': entity2,
-                            'overlap_start': max(start1, start2),
-                            'overlap_end': min(end1, end2),
-                            'overlap_length': min(end1, end2) - max(start1, start2),
-                        }
-                    )
+        active: List[Tuple[int, int]] = []
+        overlaps: List[Tuple[int, int]] = []
+
+        for rank, entity2 in enumerate(sorted_entities):
+            start2, end2 = entity2.get('start', 0), entity2.get('end', 0)
+            while active and active[0][0] <= start2:
+                heapq.heappop(active)
+            for _, rank1 in active:
+                if sorted_entities[rank1].get('start', 0) < end2:
+                    overlaps.append((rank1, rank))
+            heapq.heappush(active, (entity2.get('end', 0), rank))
+
+        # Ordre stable : regroupé par première entité, comme dans le texte
+        for rank1, rank2 in sorted(overlaps):
+            entity1, entity2 = sorted_entities[rank1], sorted_entities[rank2]
+            start1, end1 = entity1.get('start', 0), entity1.get('end', 0)
+            start2, end2 = entity2.get('start', 0), entity2.get('end', 0)
+            conflicts.append(
+                {
+                    'type': 'overlap',
+                    'entity1': entity1,
+                    'entity2': entity2,
+                    'overlap_start': max(start1, start2),
+                    'overlap_end': min(end1, end2),
+                    'overlap_length': min(end1, end2) - max(start1, start2),
+                }
+            )
 
         # --- Conflits de jetons identiques pour des valeurs différentes ---
         value_tokens: Dict[str, set] = {}
@@ -0,0 +1,73 @@
+"""
+Processus de scan regex de ``SimpleAnonymizer.detect_entities_parallel``.
+
+Module volontairement léger (ni Streamlit, ni torch, ni pandas) : les
+workers démarrés par ``forkserver`` ou ``spawn`` l'importent sans payer le
+coût d'import du script de diagnostic.
+"""
+
+import logging
+import os
+import re
+from typing import List, Tuple
+
+from ._torch_setup import THREAD_ENV_VARS
+
+# Moteur DFA optionnel (temps linéaire, sans backtracking)
+try:
+    import re2
+    RE2_SUPPORT = True
+except ImportError:
+    re2 = None
+    RE2_SUPPORT = False
+
+# Patterns propres à chaque processus de scan (compilés une fois)
+_worker_patterns = ()
+
+# Classes ``\b``, ``\w``, ``\d``, ``\s`` (et leurs négations) non échappées :
+# ASCII seulement pour re2, Unicode pour ``re``. Un ``\b`` placé après
+# ``[A-Za-zÀ-ÿ]+`` couperait « santé » en « sant » sous re2.
+_UNICODE_SENSITIVE_ESCAPE = re.compile(r"(?<!\\)(?:\\\\)*\\[bBwWdDsS]")
+
+
+def unicode_sensitive(pattern: str) -> bool:
+    """Le pattern dépend-il des classes Unicode de ``re`` ?"""
+    return _UNICODE_SENSITIVE_ESCAPE.search(pattern) is not None
+
+
+def compile_pattern(pattern: str):
+    """Compiler avec re2 si disponible et sans effet sur les résultats.
+
+    Les patterns qui reposent sur les classes Unicode de ``re`` restent sous
+    ``re`` : re2 tronquerait les entités accentuées.
+    """
+    if RE2_SUPPORT and not unicode_sensitive(pattern):
+        try:
+            return re2.compile(pattern)
+        except Exception as e:  # construction non supportée (lookaround...)
+            logging.debug(f"re2 indisponible pour ce pattern, repli sur re: {e}")
+    return re.compile(pattern)
+
+
+def init_worker(sources: Tuple[Tuple[str, str], ...]) -> None:
+    """Initialiser un processus de scan : un seul thread natif, regex compilées.
+
+    Les variables de threads sont fixées avant toute autre importation dans
+    le worker ; ce module n'importe lui-même aucune bibliothèque native
+    multi-thread.
+    """
+    global _worker_patterns
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = "1"
+    _worker_patterns = tuple(
+        (entity_type, compile_pattern(source)) for entity_type, source in sources
+    )
+
+
+def scan_chunk(offset: int, text: str) -> List[Tuple[str, int, int]]:
+    """Scanner un morceau ; tuples plutôt qu'objets pour limiter le pickling"""
+    return [
+        (entity_type, offset + m.start(), offset + m.end())
+        for entity_type, compiled in _worker_patterns
+        for m in compiled.finditer(text)
+    ]
@@ -3,11 +3,13 @@ import tempfile
 import uuid
 import shutil
 import logging
+import time
 import re
 import unicodedata
+from collections import Counter
 from pathlib import Path
 from typing import Any, Dict, List, Optional
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
 import json
 
@@ -16,6 +18,19 @@ try:  # pragma: no cover - optional dependency
 except ImportError:  # pragma: no cover - Streamlit Cloud minimal install
     chardet = None  # type: ignore
 
+try:  # pragma: no cover - optional dependency
+    import orjson
+except ImportError:  # pragma: no cover - fallback sur le module json standard
+    orjson = None  # type: ignore
+
+try:  # pragma: no cover - optional dependency
+    import xxhash
+except ImportError:  # pragma: no cover - repli sur hashlib.md5
+    xxhash = None  # type: ignore
+
+# Taille des tranches injectées dans le hash des fichiers uploadés
+HASH_CHUNK_SIZE = 1024 * 1024
+
 from .config import NAME_NORMALIZATION
 
 
@@ -265,13 +280,13 @@ def cleanup_temp_files(max_age_hours: int = 24):
         if not temp_dir.exists():
             return
         
-        cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
+        # Comparaison directe des mtime (secondes epoch) sans conversion datetime
+        cutoff_ts = time.time() - max_age_hours * 3600
         files_cleaned = 0
         
         for file_path in temp_dir.iterdir():
             if file_path.is_file():
-                file_time = datetime.fromtimestamp(file_path.stat().st_mtime)
-                if file_time < cutoff_time:
+                if file_path.stat().st_mtime < cutoff_ts:
                     try:
                         file_path.unlink()
                         files_cleaned += 1
@@ -299,6 +314,20 @@ def generate_file_hash(file_path: str) -> str:
         logging.error(f"Error generating file hash: {str(e)}")
         return ""
 
+def hash_upload_content(buffer) -> str:
+    """Empreinte rapide (non cryptographique) du contenu d'un fichier uploadé.
+
+    ``buffer`` est typiquement ``UploadedFile.getbuffer()`` : la vue mémoire
+    est parcourue par tranches de 1 Mio sans copie. xxh3 est utilisé s'il est
+    installé, MD5 sinon ; l'empreinte sert uniquement à détecter un changement
+    de fichier.
+    """
+    view = memoryview(buffer)
+    hasher = xxhash.xxh3_64() if xxhash is not None else hashlib.md5()
+    for offset in range(0, len(view), HASH_CHUNK_SIZE):
+        hasher.update(view[offset:offset + HASH_CHUNK_SIZE])
+    return hasher.hexdigest()
+
 def validate_file_type(file_path: str, allowed_extensions: List[str]) -> bool:
     """Valider le type de fichier"""
     file_extension = Path(file_path).suffix.lower().lstrip('.')
@@ -353,8 +382,14 @@ def get_file_info(file_path: str) -> Dict[str, Any]:
 def export_entities_to_json(entities: List[Dict], output_path: str) -> bool:
     """Exporter les entités vers un fichier JSON"""
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(entities, f, ensure_ascii=False, indent=2, default=str)
+        if orjson is not None:
+            # Sérialisation en C, écrite directement en UTF-8
+            payload = orjson.dumps(entities, default=str, option=orjson.OPT_INDENT_2)
+            with open(output_path, 'wb') as f:
+                f.write(payload)
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(entities, f, ensure_ascii=False, indent=2, default=str)
         logging.info(f"Entities exported to {output_path}")
         return True
     except (OSError, TypeError) as e:
@@ -365,8 +400,12 @@ def export_entities_to_json(entities: List[Dict], output_path: str) -> bool:
 def import_entities_from_json(json_path: str) -> List[Dict]:
     """Importer des entités depuis un fichier JSON"""
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            entities = json.load(f)
+        if orjson is not None:
+            with open(json_path, 'rb') as f:
+                entities = orjson.loads(f.read())
+        else:
+            with open(json_path, 'r', encoding='utf-8') as f:
+                entities = json.load(f)
         logging.info(f"Entities imported from {json_path}")
         return entities
     except (OSError, json.JSONDecodeError) as e:
@@ -399,7 +438,13 @@ def serialize_entity_mapping(
                     "canonical": info.get("canonical"),
                 }
 
-        mapping_json = json.dumps(serializable, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            # orjson encode en UTF-8 sans échappement, comme ensure_ascii=False
+            mapping_json = orjson.dumps(
+                serializable, option=orjson.OPT_INDENT_2
+            ).decode("utf-8")
+        else:
+            mapping_json = json.dumps(serializable, ensure_ascii=False, indent=2)
         if output_path:
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(mapping_json)
@@ -484,35 +529,28 @@ def sort_entities_by_position(entities: List[Dict]) -> List[Dict]:
     return sorted(entities, key=lambda x: (x.get('start', 0), x.get('end', 0)))
 
 def calculate_text_coverage(entities: List[Dict], text_length: int) -> float:
-    """Calculer le pourcentage du texte couvert par les entités"""
+    """Calculer le pourcentage du texte couvert par les entités
+
+    Balayage linéaire des plages triées : les chevauchements ne sont comptés
+    qu'une fois.
+    """
     if text_length == 0:
         return 0.0
     
     total_covered = 0
-    covered_ranges = []
+    covered_end = None
     
     # Trier les entités par position
-    sorted_entities = sort_entities_by_position(entities)
-    
-    for entity in sorted_entities:
+    for entity in sort_entities_by_position(entities):
         start = entity.get('start', 0)
         end = entity.get('end', 0)
         
-        # Fusionner les plages qui se chevauchent
-        merged = False
-        for i, (range_start, range_end) in enumerate(covered_ranges):
-            if start <= range_end and end >= range_start:
-                # Fusion des plages
-                covered_ranges[i] = (min(start, range_start), max(end, range_end))
-                merged = True
-                break
-        
-        if not merged:
-            covered_ranges.append((start, end))
-    
-    # Calculer la couverture totale
-    for start, end in covered_ranges:
-        total_covered += end - start
+        # Ne compter que la partie au-delà de la plage déjà couverte
+        if covered_end is not None:
+            start = max(start, covered_end)
+        if end > start:
+            total_covered += end - start
+            covered_end = end
     
     return (total_covered / text_length) * 100
 
@@ -533,15 +571,9 @@ def generate_anonymization_stats(
     
     # Statistiques de base
     total_entities = len(entities)
-    entity_types = {}
-    confidences = []
-    
-    for entity in entities:
-        entity_type = entity.get('type', 'UNKNOWN')
-        entity_types[entity_type] = entity_types.get(entity_type, 0) + 1
-        
-        if 'confidence' in entity:
-            confidences.append(entity['confidence'])
+    type_counts = Counter(entity.get('type', 'UNKNOWN') for entity in entities)
+    entity_types = dict(type_counts)
+    confidences = [entity['confidence'] for entity in entities if 'confidence' in entity]
     
     # Statistiques de confiance
     confidence_stats = {}
@@ -570,7 +602,7 @@ def generate_anonymization_stats(
         "coverage_percentage": coverage,
         "confidence_stats": confidence_stats,
         "recommendations": recommendations,
-        "most_common_type": max(entity_types, key=entity_types.get) if entity_types else None
+        "most_common_type": type_counts.most_common(1)[0][0] if type_counts else None
     }
 
 def generate_recommendations(entities: List[Dict], confidence_stats: Dict, coverage: float) -> List[str]:
@@ -6,6 +6,8 @@ Test d'installation simplifié - Sans emojis pour éviter les problèmes d'encod
 import sys
 import os
 
+from src import _torch_setup
+
 def test_installation():
     """Tester l'installation avec gestion d'encodage Windows"""
     
@@ -13,9 +15,10 @@ def test_installation():
     print(f"Python version: {sys.version}")
     print()
     
-    # Configuration anti-conflit
+    # Configuration anti-conflit : memes threads natifs que l'application
+    # (coeurs physiques / processus par noeud), sauf reglage explicite
     os.environ["TOKENIZERS_PARALLELISM"] = "false"
-    os.environ["OMP_NUM_THREADS"] = "1"
+    _torch_setup.apply_thread_env()
     
     modules_status = {}
     
@@ -13,7 +13,7 @@ import json
 # Ajouter le chemin du projet pour les imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from src.anonymizer import RegexAnonymizer, DocumentAnonymizer, Entity
+from src.anonymizer import RegexAnonymizer, DocumentAnonymizer, AIAnonymizer, Entity, build_replacer
 from src.entity_manager import EntityManager
 from src.utils import (
     format_file_size,
@@ -29,6 +29,26 @@ class TestRegexAnonymizer(unittest.TestCase):
     def setUp(self):
         self.anonymizer = RegexAnonymizer()
     
+    def test_entity_uses_slots(self):
+        """Les entités ne portent pas de __dict__ par instance"""
+        entity = Entity(id="1", type="EMAIL", value="a@b.fr", start=0, end=6)
+        self.assertFalse(hasattr(entity, "__dict__"))
+        with self.assertRaises(AttributeError):
+            entity.unknown_attr = 1
+
+    def test_entity_to_dict_matches_asdict(self):
+        """to_dict produit la même structure que dataclasses.asdict"""
+        from dataclasses import asdict
+
+        entity = Entity(
+            id="1", type="PERSON", value="Jean", start=0, end=4,
+            variants=["Jean", "J."], all_positions=[(0, 4)],
+        )
+        data = entity.to_dict()
+        self.assertEqual(data, asdict(entity))
+        data["variants"].append("x")
+        self.assertEqual(entity.variants, ["Jean", "J."])
+
     def test_email_detection(self):
         """Test de détection d'emails"""
         text = "Contactez-moi à john.doe@example.com ou admin@test.fr"
@@ -39,6 +59,26 @@ class TestRegexAnonymizer(unittest.TestCase):
         self.assertEqual(email_entities[0].value, "john.doe@example.com")
         self.assertEqual(email_entities[1].value, "admin@test.fr")
     
+    def test_prefilter_skips_impossible_patterns(self):
+        """Les patterns intégrés sans caractère requis dans le texte sont ignorés"""
+        email_pattern = self.anonymizer.compiled_patterns["EMAIL"]
+        with mock.patch.object(
+            self.anonymizer, "compiled_patterns",
+            {"EMAIL": mock.Mock(wraps=email_pattern)},
+        ):
+            self.anonymizer.detect_entities("Aucune adresse ici")
+            self.anonymizer.compiled_patterns["EMAIL"].finditer.assert_not_called()
+
+        # Un pattern personnalisé n'est jamais préfiltré
+        self.anonymizer.refresh_patterns(patterns={"EMAIL": r"\bcontact\b"})
+        custom_pattern = self.anonymizer.compiled_patterns["EMAIL"]
+        with mock.patch.object(
+            self.anonymizer, "compiled_patterns",
+            {"EMAIL": mock.Mock(wraps=custom_pattern)},
+        ):
+            self.anonymizer.detect_entities("Écrire au contact")
+            self.anonymizer.compiled_patterns["EMAIL"].finditer.assert_called_once()
+
     def test_phone_detection(self):
         """Test de détection de téléphones"""
         text = "Appelez le 01 23 45 67 89 ou 0987654321"
@@ -315,6 +355,14 @@ class TestRegexAnonymizer(unittest.TestCase):
         self.assertNotEqual(token_doe, token_john)
         self.assertEqual(anonymized, f"{token_doe} and {token_john}")
 
+    def test_build_replacer_prefers_longest_value(self):
+        """Le remplaceur fusionné privilégie les valeurs les plus longues"""
+        replace = build_replacer({"Jean": "[PERSON_2]", "Jean Dupont": "[PERSON_1]", "": "[X]"})
+        self.assertEqual(
+            replace("Jean Dupont et Jean"), "[PERSON_1] et [PERSON_2]"
+        )
+        self.assertEqual(build_replacer({})("inchangé"), "inchangé")
+
 class TestEntityManager(unittest.TestCase):
     """Tests pour le gestionnaire d'entités"""
     
@@ -580,6 +628,24 @@ class TestUtils(unittest.TestCase):
         finally:
             os.unlink(tmp.name)
 
+    def test_serialize_entity_mapping_keeps_accents(self):
+        """Les caractères accentués ne sont pas échappés"""
+        mapping = {
+            "PERSON": {
+                "hélène durand": {
+                    "token": "[PERSON_1]",
+                    "variants": {"Hélène Durand"},
+                    "canonical": "Hélène Durand",
+                }
+            }
+        }
+        json_str = serialize_entity_mapping(mapping)
+        self.assertIn("Hélène Durand", json_str)
+        self.assertEqual(
+            json.loads(json_str)["PERSON"]["hélène durand"]["variants"],
+            ["Hélène Durand"],
+        )
+
 class TestDocumentAnonymizer(unittest.TestCase):
     """Tests pour l'anonymiseur de documents"""
     
@@ -831,6 +897,24 @@ class TestDocumentAnonymizer(unittest.TestCase):
         finally:
             os.unlink(temp_path)
 
+    def test_process_document_reports_progress(self):
+        """Le callback de progression suit les phases réelles du traitement"""
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False, encoding="utf-8") as f:
+            f.write("Contact: jean.dupont@email.com")
+            temp_path = f.name
+        calls = []
+        try:
+            result = self.anonymizer.process_document(
+                temp_path, mode="regex",
+                progress_callback=lambda pct, msg: calls.append(pct),
+            )
+            self.assertEqual(result["status"], "success")
+            self.assertEqual(calls, [25, 35, 70, 90])
+        finally:
+            os.unlink(temp_path)
+            if result.get("anonymized_path") and os.path.exists(result["anonymized_path"]):
+                os.unlink(result["anonymized_path"])
+
     def test_extract_text_exotic_encoding(self):
         """Extraction correcte d'un fichier encodé en latin-1"""
         content = "Café à Paris"
@@ -844,6 +928,50 @@ class TestDocumentAnonymizer(unittest.TestCase):
         finally:
             os.unlink(path)
 
+    def test_failed_spacy_load_is_reported_as_regex(self):
+        """Un modèle SpaCy introuvable au chargement n'est pas compté comme IA"""
+        import src.anonymizer as anonymizer_module
+
+        def select_model(ai):
+            ai._spacy_model_name = "fr_core_news_sm"
+
+        with mock.patch.object(AIAnonymizer, "_initialize_model_safe", select_model):
+            ai = AIAnonymizer(model_config={"type": "spacy", "name": "fr_core_news_sm"})
+        self.assertFalse(ai.model_loaded)
+        self.assertTrue(ai.model_available)
+
+        failing_spacy = mock.Mock()
+        failing_spacy.load.side_effect = OSError("modèle absent")
+        self.anonymizer.ai_anonymizer = ai
+        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False, encoding="utf-8") as f:
+            f.write("Contact : jean.dupont@example.com")
+            path = f.name
+        try:
+            with mock.patch.object(anonymizer_module, "_lazy", return_value=failing_spacy):
+                result = self.anonymizer.process_document(path, mode="ai", audit=False)
+        finally:
+            os.unlink(path)
+
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["metadata"]["detection_method"], "regex")
+        self.assertIn("modèle absent", result["metadata"]["ai_error"])
+        self.assertFalse(ai.model_available)
+
+    def test_probe_ner_status_does_not_load_models(self):
+        """Le sondage NER se fonde sur les paquets installés uniquement"""
+        import src.anonymizer as anonymizer_module
+
+        with mock.patch.object(anonymizer_module, "SPACY_SUPPORT", False), \
+                mock.patch.object(anonymizer_module, "TRANSFORMERS_SUPPORT", False):
+            self.assertEqual(DocumentAnonymizer.probe_ner_status(), ("regex", False))
+
+        with mock.patch.object(anonymizer_module, "SPACY_SUPPORT", True), \
+                mock.patch.object(anonymizer_module, "find_spec", return_value=None), \
+                mock.patch.object(anonymizer_module, "AIAnonymizer") as ai_cls:
+            self.assertEqual(DocumentAnonymizer.probe_ner_status(), ("spacy", False))
+            ai_cls.assert_not_called()
+
+
 class TestIntegration(unittest.TestCase):
     """Tests d'intégration"""
     
@@ -939,6 +1067,63 @@ class TestFalsePositiveFiltering(unittest.TestCase):
         finally:
             os.remove(config_path)
 
+
+class TestAIChunking(unittest.TestCase):
+    """Tests du découpage en chunks de l'anonymiseur IA"""
+
+    def test_chunk_text_cuts_on_sentence_boundaries(self):
+        ai = AIAnonymizer.__new__(AIAnonymizer)
+        text = ("Première phrase courte ici ! " * 3) + "x" * 40
+        chunks = ai._chunk_text(text, max_length=60)
+        self.assertEqual("".join(chunk for _, chunk in chunks), text)
+        self.assertTrue(chunks[0][1].endswith("!"))
+        for offset, chunk in chunks:
+            self.assertEqual(text[offset:offset + len(chunk)], chunk)
+
+
+    def test_transformers_chunks_are_batched(self):
+        ai = AIAnonymizer.__new__(AIAnonymizer)
+        ai.model_config = {"name": "test-model"}
+        text = ("Jean Dupont habite ici. " * 40).strip()
+        chunks = ai._chunk_text(text, max_length=512)
+        self.assertGreater(len(chunks), 1)
+
+        ai.nlp_pipeline = mock.Mock(return_value=[
+            [{"entity_group": "PER", "word": "Jean Dupont", "score": 0.99, "start": 0, "end": 11}]
+            for _ in chunks
+        ])
+        entities = ai._detect_with_transformers(text, 0.5, batch_size=8)
+
+        ai.nlp_pipeline.assert_called_once_with([c for _, c in chunks], batch_size=8)
+        self.assertEqual([e.start for e in entities], [offset for offset, _ in chunks])
+
+class TestLazyImports(unittest.TestCase):
+    """Les dépendances IA lourdes ne sont pas importées au chargement"""
+
+    def test_import_does_not_load_heavy_dependencies(self):
+        import subprocess
+
+        code = (
+            "import sys; import src.anonymizer; "
+            "print(','.join(m for m in ('torch', 'transformers', 'spacy', 'pdfplumber') "
+            "if m in sys.modules))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=str(Path(__file__).parent.parent),
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "")
+
+    def test_french_stop_words_resolved_on_access(self):
+        import src.anonymizer as anonymizer_module
+
+        self.assertIn("le", anonymizer_module.FRENCH_STOP_WORDS)
+        with self.assertRaises(AttributeError):
+            anonymizer_module.does_not_exist
+
 if __name__ == "__main__":
     # Configuration des tests
     unittest.main(verbosity=2)
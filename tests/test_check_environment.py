@@ -0,0 +1,144 @@
+import os
+import re
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+root_dir = Path(__file__).resolve().parents[1]
+sys.path.append(str(root_dir))
+
+# Le script configure une page Streamlit dès l'import : module factice le
+# temps de l'import (les autres modules importés restent chargés), et
+# variables d'environnement restaurées ensuite
+_streamlit = sys.modules.get("streamlit")
+sys.modules["streamlit"] = MagicMock()
+try:
+    with patch.dict(os.environ):
+        import check_environment
+finally:
+    if _streamlit is None:
+        del sys.modules["streamlit"]
+    else:
+        sys.modules["streamlit"] = _streamlit
+
+from src import scan_worker
+from src.config import ENTITY_PATTERNS
+
+# Numéros dont plusieurs types se recouvrent (SIRET/SIREN, téléphone, IBAN,
+# carte, TVA) : une alternance unique retiendrait la première branche trouvée
+SAMPLE_TEXT = (
+    "SIRET 123 456 789 12345678901, SIREN 987654321. Tél : 01 23 45 67 89 "
+    "ou +33612345678 à 14:30. IBAN FR76 30006 00001 12345678901 89, TVA "
+    "FR12345678901. NIR 185057512345612, le 12/03/2021 4970 1012 3456 7890, "
+    "contact jean.dupont@example.fr, 75008 Paris, AB-123-CD."
+)
+
+# Entités accentuées en fin de correspondance : les ``\b`` ASCII de re2 les
+# tronqueraient (« sant », « ét »)
+ACCENTED_TEXT = (
+    "Vu l'article 12 du Code de la santé. Domicile : 12 rue de l'été, "
+    "75008 Paris été. Écrire à éjean@exemple.fr"
+)
+
+
+def reference_spans(text):
+    """Scan indépendant par pattern puis plus longue correspondance (version d'origine)"""
+    entities = []
+    for entity_type, pattern in ENTITY_PATTERNS.items():
+        for match in re.compile(pattern, re.IGNORECASE | re.MULTILINE).finditer(text):
+            entities.append((entity_type, match.start(), match.end()))
+    entities.sort(key=lambda e: e[1])
+
+    kept = []
+    for entity in entities:
+        overlapping = next((a for a in kept if entity[1] < a[2] and entity[2] > a[1]), None)
+        if overlapping is None:
+            kept.append(entity)
+        elif entity[2] - entity[1] > overlapping[2] - overlapping[1]:
+            kept.remove(overlapping)
+            kept.append(entity)
+    return kept
+
+
+def make_anonymizer():
+    # Le script importe ``.config`` comme s'il était placé dans ``src``
+    with patch.object(check_environment, "__package__", "src"):
+        return check_environment.SimpleAnonymizer()
+
+
+class TestSimpleAnonymizer(unittest.TestCase):
+    """Tests for the regex-only anonymizer of the diagnostic script."""
+
+    def test_detection_matches_per_pattern_scan(self):
+        anonymizer = make_anonymizer()
+        spans = [(e["type"], e["start"], e["end"]) for e in anonymizer.detect_entities(SAMPLE_TEXT)]
+        self.assertEqual(spans, reference_spans(SAMPLE_TEXT))
+        self.assertIn(("SIRET", 14, 29), spans)
+
+    def test_detect_entities_keeps_dict_interface(self):
+        anonymizer = make_anonymizer()
+        entities = anonymizer.detect_entities(SAMPLE_TEXT)
+        records = anonymizer.detect_entity_records(SAMPLE_TEXT)
+
+        self.assertEqual(len(entities), len(records))
+        first = entities[0]
+        self.assertEqual(set(first), {"id", "type", "value", "start", "end", "confidence", "replacement"})
+        self.assertEqual(first["value"], SAMPLE_TEXT[first["start"]:first["end"]].strip())
+        self.assertEqual(
+            anonymizer.anonymize_text(SAMPLE_TEXT, entities),
+            anonymizer.anonymize_text(SAMPLE_TEXT, records),
+        )
+
+    def test_anonymize_text_defaults_missing_replacement_to_type(self):
+        anonymizer = make_anonymizer()
+        entities = [{"type": "EMAIL", "start": 8, "end": 15}]
+        self.assertEqual(anonymizer.anonymize_text("Contact a@b.com.", entities), "Contact [EMAIL].")
+
+    def test_parallel_detection_matches_sequential(self):
+        anonymizer = make_anonymizer()
+        # Morceaux découpés sur des espaces : aucune entité n'est coupée
+        chunks = []
+        offset = 0
+        for part in SAMPLE_TEXT.split(". "):
+            chunks.append((offset, part))
+            offset += len(part) + 2
+
+        expected = [(e["type"], e["start"], e["end"]) for e in anonymizer.detect_entities(SAMPLE_TEXT)]
+        # Méthode de démarrage par défaut, puis fork (suite de tests mono-thread)
+        for start_method in (None, "fork"):
+            with self.subTest(start_method=start_method):
+                records = anonymizer.detect_entities_parallel(
+                    chunks, max_workers=2, start_method=start_method
+                )
+                self.assertEqual([(e.type, e.start, e.end) for e in records], expected)
+
+
+class TestScanWorkerEngines(unittest.TestCase):
+    """Tests for the regex engine selection of the scan workers."""
+
+    def test_compiled_patterns_match_re_on_accented_text(self):
+        for entity_type, pattern in ENTITY_PATTERNS.items():
+            source = "(?im)" + pattern
+            with self.subTest(entity_type=entity_type):
+                self.assertEqual(
+                    [m.span() for m in scan_worker.compile_pattern(source).finditer(ACCENTED_TEXT)],
+                    [m.span() for m in re.compile(source).finditer(ACCENTED_TEXT)],
+                )
+
+    @unittest.skipUnless(scan_worker.RE2_SUPPORT, "google-re2 non installé")
+    def test_re2_only_for_patterns_without_unicode_classes(self):
+        self.assertIsInstance(scan_worker.compile_pattern(r"\bFR\d{2}"), re.Pattern)
+
+        source = r"(?i)[a-zà-ÿ]+-[0-9]{3}"
+        compiled = scan_worker.compile_pattern(source)
+        self.assertNotIsInstance(compiled, re.Pattern)
+        text = "Été-123 et AB-456"
+        self.assertEqual(
+            [m.span() for m in compiled.finditer(text)],
+            [m.span() for m in re.compile(source).finditer(text)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
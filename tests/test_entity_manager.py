@@ -1,5 +1,7 @@
 import unittest
 import sys
+import os
+import tempfile
 from pathlib import Path
 
 # Ajouter le chemin du projet pour les imports
@@ -53,6 +55,14 @@ class TestGroupManagement(unittest.TestCase):
         self.assertIn(group_id, grouped)
         self.assertEqual(grouped[group_id]["token"], "[MON_GROUPE]")
 
+    def test_create_group_without_readable_name_uses_sequence(self):
+        """Un nom sans caractère alphanumérique reçoit un numéro séquentiel."""
+        first = self.manager.create_group("???")
+        second = self.manager.create_group("!!!")
+
+        self.assertEqual(first, "GROUP_1")
+        self.assertEqual(second, "GROUP_2")
+
     def test_get_grouped_entities(self):
         """Vérifie la création correcte des groupes d'entités."""
         # Deux entités partageant le même jeton de remplacement
@@ -204,6 +214,22 @@ class TestGroupManagement(unittest.TestCase):
         self.assertEqual(token_conflicts[0]["value"], "Alice")
         self.assertEqual(set(token_conflicts[0]["tokens"]), {"[PERSON_1]", "[PERSON_3]"})
 
+    def test_get_entity_conflicts_nested_overlaps(self):
+        """Une entité longue chevauche toutes celles qu'elle contient."""
+
+        for start, end in ((0, 30), (2, 5), (10, 12), (28, 35), (40, 45)):
+            self.manager.add_entity(
+                {"type": "ORG", "value": f"v{start}", "start": start, "end": end}
+            )
+
+        overlaps = [
+            (c["entity1"]["start"], c["entity2"]["start"], c["overlap_length"])
+            for c in self.manager.get_entity_conflicts()
+            if c["type"] == "overlap"
+        ]
+
+        self.assertEqual(overlaps, [(0, 2, 3), (0, 10, 2), (0, 28, 2)])
+
     def test_split_and_merge_and_reassign(self):
         """Vérifie les helpers de résolution de conflits."""
 
@@ -260,6 +286,97 @@ class TestGroupManagement(unittest.TestCase):
         self.assertEqual(self.manager.entities[0]["value"], "Eve")
         self.assertIsNone(self.manager._grouped_entities_cache)
 
+    def test_delete_group_by_token_cleans_manual_groups(self):
+        a = self.manager.add_entity({"type": "PERSON", "value": "Alice", "start": 0, "end": 5, "replacement": "[PERSON_1]"})
+        e = self.manager.add_entity({"type": "PERSON", "value": "Eve", "start": 6, "end": 9, "replacement": "[PERSON_2]"})
+        group_id = self.manager.create_group("Mix", entity_ids=[a, e])
+        self.manager.update_entity(a, {"replacement": "[PERSON_1]"})
+        self.manager.update_entity(e, {"replacement": "[PERSON_2]"})
+
+        self.assertEqual(self.manager.delete_group_by_token("PERSON_1"), 1)
+        self.assertEqual(self.manager.get_group_by_id(group_id)["entity_ids"], [e])
+
+    def test_get_entity_by_id_tracks_list_changes(self):
+        first = self.manager.add_entity({"type": "EMAIL", "value": "a@b.com", "start": 0, "end": 7})
+        self.assertEqual(self.manager.get_entity_by_id(first)["value"], "a@b.com")
+
+        # Mutation directe de la liste, comme le fait l'interface Streamlit
+        self.manager.entities.append({"id": "manual", "type": "PHONE", "value": "0102030405", "start": 8, "end": 18})
+        self.assertEqual(self.manager.get_entity_by_id("manual")["type"], "PHONE")
+
+        self.manager.delete_entity(first)
+        self.assertIsNone(self.manager.get_entity_by_id(first))
+
+    def test_get_entity_by_id_after_list_reassignment(self):
+        # main.py réassigne ``entities`` à chaque exécution : une nouvelle liste
+        # de même taille (dont l'id() peut être réutilisé) ne doit jamais
+        # renvoyer une entité périmée
+        def make_list(value):
+            return [{"id": "e1", "type": "EMAIL", "value": value, "start": 0, "end": 7}]
+
+        self.manager.entities = make_list("a@b.com")
+        self.assertEqual(self.manager.get_entity_by_id("e1")["value"], "a@b.com")
+        self.manager.entities = make_list("c@d.com")
+        self.manager.entities = make_list("e@f.com")
+        self.assertIs(self.manager.get_entity_by_id("e1"), self.manager.entities[0])
+
+        self.assertTrue(self.manager.update_entity("e1", {"value": "g@h.com"}))
+        self.assertEqual(self.manager.entities[0]["value"], "g@h.com")
+
+        # Remplacement d'un élément en place, taille inchangée
+        self.manager.entities[0] = {"id": "e1", "type": "PHONE", "value": "0102030405", "start": 0, "end": 10}
+        self.assertEqual(self.manager.get_entity_by_id("e1")["type"], "PHONE")
+
+    def test_delete_entity_removes_it_from_every_group(self):
+        a = self.manager.add_entity({"type": "EMAIL", "value": "a@b.com", "start": 0, "end": 7})
+        b = self.manager.add_entity({"type": "EMAIL", "value": "c@d.com", "start": 8, "end": 15})
+        g1 = self.manager.create_group("Un", entity_ids=[a, b])
+        g2 = self.manager.create_group("Deux", entity_ids=[a])
+
+        self.assertTrue(self.manager.delete_entity(a))
+        self.assertEqual(self.manager.get_group_by_id(g1)["entity_ids"], [b])
+        self.assertEqual(self.manager.get_group_by_id(g2)["entity_ids"], [])
+
+
+    def test_bulk_load_assigns_ids_and_skips_duplicates(self):
+        entities = [
+            {"type": "EMAIL", "value": "a@b.com", "start": 0, "end": 7},
+            {"id": "known", "type": "PHONE", "value": "0102030405", "start": 8, "end": 18},
+            {"type": "EMAIL", "value": "a@b.com", "start": 0, "end": 7},
+        ]
+        manager = EntityManager.bulk_load(entities)
+
+        self.assertEqual(len(manager.entities), 2)
+        self.assertTrue(manager.entities[0]["id"])
+        self.assertEqual(manager.get_entity_by_id("known")["type"], "PHONE")
+        self.assertEqual(manager.history, [])
+
+        with self.assertRaises(ValueError):
+            EntityManager.bulk_load([{"type": "EMAIL", "value": "x"}])
+
+
+class TestPersistence(unittest.TestCase):
+    """Tests d'export/import JSON de l'EntityManager"""
+
+    def test_json_round_trip(self):
+        manager = EntityManager()
+        entity_id = manager.add_entity(
+            {"type": "PERSON", "value": "Élodie", "start": 0, "end": 6, "replacement": "[PERSON_1]"}
+        )
+        manager.create_group("Personnes", entity_ids=[entity_id])
+
+        with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+            path = tmp.name
+        try:
+            self.assertTrue(manager.export_to_json(path))
+            restored = EntityManager()
+            self.assertTrue(restored.import_from_json(path))
+        finally:
+            os.unlink(path)
+
+        self.assertEqual(restored.entities[0]["value"], "Élodie")
+        self.assertEqual(restored.groups[0]["entity_ids"], [entity_id])
+
 
 if __name__ == "__main__":  # pragma: no cover
     unittest.main()
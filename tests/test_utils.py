@@ -1,8 +1,24 @@
 import os
+import tempfile
+import time
 import unittest
-from unittest.mock import patch
+from contextlib import nullcontext
+from pathlib import Path
+from unittest.mock import MagicMock, patch
 
-from src.utils import normalize_name, similarity, get_similarity_weights, ensure_unicode
+from src.utils import (
+    normalize_name,
+    similarity,
+    get_similarity_weights,
+    ensure_unicode,
+    cleanup_temp_files,
+    hash_upload_content,
+    calculate_text_coverage,
+    export_entities_to_json,
+    import_entities_from_json,
+)
+from src import _torch_setup
+from src._torch_setup import apply_thread_env, compute_num_threads
 
 
 class TestNormalizeName(unittest.TestCase):
@@ -54,3 +70,101 @@ class TestEnsureUnicode(unittest.TestCase):
             with self.assertRaises(UnicodeDecodeError):
                 ensure_unicode(bad_bytes)
 
+
+class TestCleanupTempFiles(unittest.TestCase):
+    """Tests for the cleanup_temp_files utility."""
+
+    def test_removes_only_expired_files(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            upload_dir = Path(tmp) / "anonymizer_uploads"
+            upload_dir.mkdir()
+            old_file = upload_dir / "old.txt"
+            new_file = upload_dir / "new.txt"
+            old_file.write_text("old")
+            new_file.write_text("new")
+            two_days_ago = time.time() - 48 * 3600
+            os.utime(old_file, (two_days_ago, two_days_ago))
+
+            with patch("src.utils.tempfile.gettempdir", return_value=tmp):
+                cleanup_temp_files(max_age_hours=24)
+
+            self.assertFalse(old_file.exists())
+            self.assertTrue(new_file.exists())
+
+
+class TestTextCoverage(unittest.TestCase):
+    """Tests for the entity coverage percentage."""
+
+    def test_overlapping_and_nested_ranges_counted_once(self):
+        entities = [
+            {"start": 10, "end": 20},
+            {"start": 0, "end": 5},
+            {"start": 15, "end": 30},
+            {"start": 22, "end": 25},
+            {"start": 40, "end": 40},
+        ]
+        self.assertAlmostEqual(calculate_text_coverage(entities, 100), 25.0)
+        self.assertEqual(calculate_text_coverage(entities, 0), 0.0)
+
+
+class TestHashUploadContent(unittest.TestCase):
+    """Tests for the upload fingerprint helper."""
+
+    def test_chunked_hash_matches_single_pass(self):
+        data = os.urandom(3 * 1024 * 1024 + 17)
+        with patch("src.utils.HASH_CHUNK_SIZE", 1024):
+            chunked = hash_upload_content(data)
+        self.assertEqual(chunked, hash_upload_content(memoryview(data)))
+        self.assertNotEqual(chunked, hash_upload_content(data[:-1]))
+
+
+class TestEntitiesJson(unittest.TestCase):
+    """Tests for the entity JSON export/import helpers."""
+
+    def test_round_trip_with_and_without_orjson(self):
+        entities = [{"type": "PERSON", "value": "Élodie", "start": 0, "end": 6}]
+        for context in (nullcontext(), patch("src.utils.orjson", None)):
+            with context, tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "entities.json")
+                self.assertTrue(export_entities_to_json(entities, path))
+                self.assertIn("Élodie", Path(path).read_text(encoding="utf-8"))
+                self.assertEqual(import_entities_from_json(path), entities)
+
+
+class TestThreadSetup(unittest.TestCase):
+    """Tests for the native thread-count helpers."""
+
+    def test_threads_split_across_processes_per_node(self):
+        with patch("psutil.cpu_count", return_value=8):
+            with patch.dict(os.environ, {"NPROC_PER_NODE": "2"}):
+                self.assertEqual(compute_num_threads(), 4)
+            with patch.dict(os.environ, {"NPROC_PER_NODE": "16"}):
+                self.assertEqual(compute_num_threads(), 1)
+
+    def test_explicit_setting_is_not_overridden(self):
+        with patch.dict(os.environ, {"OMP_NUM_THREADS": "3"}):
+            applied = apply_thread_env(6)
+            self.assertEqual(applied["OMP_NUM_THREADS"], "3")
+            self.assertEqual(os.environ["OMP_NUM_THREADS"], "3")
+
+    def test_torch_threads_configured_once(self):
+        fake_torch = MagicMock()
+        with patch.dict("sys.modules", {"torch": fake_torch}), \
+                patch.object(_torch_setup, "_threads_configured", False):
+            self.assertTrue(_torch_setup.once(2))
+            self.assertTrue(_torch_setup.once(4))
+        fake_torch.set_num_threads.assert_called_once_with(2)
+        fake_torch.set_num_interop_threads.assert_called_once_with(1)
+
+    def test_inference_context_uses_bf16_only_when_supported(self):
+        fake_torch = MagicMock()
+        for supported in (False, True):
+            fake_torch.reset_mock()
+            fake_torch.ops.mkldnn._is_mkldnn_bf16_supported.return_value = supported
+            _torch_setup.cpu_bf16_supported.cache_clear()
+            with patch.dict("sys.modules", {"torch": fake_torch}):
+                with _torch_setup.inference_context():
+                    pass
+            fake_torch.inference_mode.assert_called_once_with()
+            self.assertEqual(fake_torch.autocast.called, supported)
+        _torch_setup.cpu_bf16_supported.cache_clear()